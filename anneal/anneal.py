@@ -1,16 +1,45 @@
 import abc
+import concurrent.futures
 import copy
+import functools
 import logging
 import math
+import multiprocessing
+import numpy as np
+import os
 import pickle
 import random
-from collections import deque
-from anneal import helpers
+import threading
+import time
+import timeit
+from collections import deque, namedtuple
+from anneal import helpers, schedules, trajectory
+
+
+RunResult = namedtuple("RunResult", ["state", "energy", "exit", "time",
+                                     "seed"])
+RunResult.__doc__ = """Outcome of a single anneal() call made by run().
+
+state and energy are what anneal() returned, exit is its last_exit message,
+time is the wall-clock time it took (in seconds), and seed is the seed the
+random number generators were given (None if they weren't reseeded).
+"""
 
 
 class BaseAnnealer(metaclass=abc.ABCMeta):
     """Template method pattern for perfoming simulated annealing."""
 
+    # number of uniforms drawn from rng at once by uniform()
+    uniform_block_size = 1024
+
+    # relative change in temperature after which the weights of all moves are
+    # recomputed in rejection-free mode
+    rejection_free_tol = 0.01
+
+    # event shared by the copies of an annealer run in parallel by run(), set
+    # once the runs are cancelled
+    _cancel_event = None
+
     def __init__(self, initial_state, max_steps=None, *args, **kwargs):
         """
         Parameters
@@ -23,8 +52,22 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
 
             The maximum steps the algorithm is allowed to take. May be changed
             later.
+
+        seed : int, optional
+            Default is None.
+
+            Seed for the random number generator of the annealer (see
+            reseed).
+
+        rng : numpy.random.Generator, optional
+            Default is None.
+
+            Random number generator to use instead of creating one from seed.
         """
+        self.reseed(kwargs.get("seed", None), kwargs.get("rng", None))
+
         self._initial_state = self.copy_method(initial_state)
+        self.__run_control = _RunControl()
 
         if max_steps is not None:
             self.max_steps = max_steps
@@ -39,6 +82,36 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
                                                   self.max_steps,
                                                   self.energy)
 
+    def reseed(self, seed=None, rng=None):
+        """Gives the annealer a new random number generator, rng (a
+        numpy.random.Generator), created from seed if rng isn't given.
+
+        All of the randomness of anneal() (and of the example subclasses)
+        comes from rng, so annealers with different generators can run side
+        by side (e.g. in threads) and still be reproduced.
+        """
+        if rng is None:
+            rng = np.random.default_rng(seed)
+
+        self.rng = rng
+        self._uniforms = []
+
+    def uniform(self):
+        """Returns a random float in [0, 1) drawn from rng.
+
+        The floats are generated uniform_block_size at a time, which makes
+        this much cheaper than a call to rng.random().
+        """
+        try:
+            return self._uniforms.pop()
+        except IndexError:
+            self._uniforms = self.rng.random(self.uniform_block_size).tolist()
+            return self._uniforms.pop()
+
+    def randrange(self, n):
+        """Returns a random integer in [0, n), using uniform()."""
+        return int(self.uniform() * n)
+
     @property
     def defaults(self):
         """Default values for various parameters."""
@@ -46,10 +119,22 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
                     energy_break_rounds=-1,
                     energy_break_tol=-1,
                     temp_tol=-1,
+                    target_energy=None,
+                    time_limit=None,
+                    deadline=None,
+                    check_interval=100,
+                    time_schedule=False,
                     verbose=0,
                     debug=False,
                     pickle=False,
-                    pickle_file=None)
+                    pickle_file=None,
+                    record_every=None,
+                    record_buffer=1000,
+                    record_format="pickle",
+                    checkpoint_every=None,
+                    checkpoint_file=None,
+                    schedule=None,
+                    rejection_free=False)
 
     @property
     def step(self):
@@ -70,8 +155,12 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
 
     @property
     def energy(self):
-        """The energy of the current state."""
-        return self.energy_method(self.state)
+        """The energy of the current state.
+
+        This is cached by anneal() and only recomputed when a new state is
+        accepted.
+        """
+        return self._energy
 
     @property
     def state(self):
@@ -90,8 +179,8 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
 
     @property
     def best_energy(self):
-        """The energy of best_state."""
-        return self.energy_method(self.best_state)
+        """The energy of best_state (cached, like energy)."""
+        return self._best_energy
 
     @property
     def energy_queue(self):
@@ -117,11 +206,49 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
         except AttributeError:
             return None
 
+    @property
+    def last_checkpoint(self):
+        """Returns the filename of the last checkpoint written by anneal()."""
+        try:
+            return self.__last_checkpoint
+        except AttributeError:
+            return None
+
+    @property
+    def elapsed(self):
+        """Time (in seconds) since the last call to anneal() started."""
+        return timeit.default_timer() - self.__start_time
+
+    def cancel(self):
+        """Asks a running anneal() to stop (e.g. from another thread). It will
+        stop within check_interval steps, returning the best state found so
+        far, and a run() in progress won't start any more runs.
+
+        Parallel runs in progress are stopped too, if their workers were
+        created by run() or executor is a ThreadPoolExecutor; with other
+        executors, only the runs which haven't started yet are cancelled.
+        """
+        # setting an attribute is atomic, so this needs no lock; run() keeps
+        # its own flag, since each anneal() it starts clears _cancelled
+        self._cancelled = True
+        self._run_cancelled = True
+        self.__run_control.cancel()
+
+    @property
+    def last_runs(self):
+        """Returns a list of RunResults for the runs of the last call to run()
+        (in the order they were started)."""
+        try:
+            return self.__last_runs
+        except AttributeError:
+            return None
+
     def _reset(self, *args, **kwargs):
         """Resets the state of the annealer with the given options."""
 
         self._step = 0
         self._state = self.copy_method(self.initial_state)
+        self._energy = self.energy_method(self._state)
 
         self.max_steps = kwargs.get("max_steps", self.max_steps)
 
@@ -134,19 +261,81 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
                 "pickle", self.defaults["pickle"])
         self.__pickle_file = kwargs.get(
                 "pickle_file", self.defaults["pickle_file"])
+        self.__record_every = kwargs.get(
+                "record_every", self.defaults["record_every"])
+        self.__record_buffer = kwargs.get(
+                "record_buffer", self.defaults["record_buffer"])
+        self.__record_format = kwargs.get(
+                "record_format", self.defaults["record_format"])
+
+        if self.__record_format not in ["pickle", "npy"]:
+            raise ValueError("record_format must be 'pickle' or 'npy'.")
+
+        self.__recorder = None
         self.__energy_break_rounds = kwargs.get(
                 "energy_break_rounds", self.defaults["energy_break_rounds"])
         self.__energy_break_tol = kwargs.get(
                 "energy_break_tol", self.defaults["energy_break_tol"])
         self.__temp_tol = kwargs.get(
                 "temp_tol", self.defaults["temp_tol"])
+        self.__target_energy = kwargs.get(
+                "target_energy", self.defaults["target_energy"])
+        self.__check_interval = kwargs.get(
+                "check_interval", self.defaults["check_interval"])
+        self.__time_schedule = kwargs.get(
+                "time_schedule", self.defaults["time_schedule"])
+        self.__checkpoint_every = kwargs.get(
+                "checkpoint_every", self.defaults["checkpoint_every"])
+        self.__checkpoint_file = kwargs.get(
+                "checkpoint_file", self.defaults["checkpoint_file"])
+        self.__rejection_free = kwargs.get(
+                "rejection_free", self.defaults["rejection_free"])
+        self.__weights_temp = None
+
+        if self.__rejection_free and not self.can_enumerate_moves:
+            raise ValueError("rejection_free requires the moves, delta_energy "
+                             "and apply methods.")
+
+        time_limit = kwargs.get("time_limit", self.defaults["time_limit"])
+        deadline = kwargs.get("deadline", self.defaults["deadline"])
+
+        schedule = kwargs.get("schedule", self.defaults["schedule"])
+
+        if isinstance(schedule, schedules.TimeBased):
+            if time_limit is None or schedule.time_limit < time_limit:
+                time_limit = schedule.time_limit
+
+            self.__time_schedule = True
+            schedule = schedule.schedule
+
+        self.__schedule = self._make_schedule(schedule)
+
+        # (the time exit is reported as a "deadline" one if the deadline
+        # comes first)
+        self.__deadline = None
+
+        if deadline is not None:
+            remaining = deadline - time.time()
+
+            if time_limit is None or remaining < time_limit:
+                time_limit = remaining
+                self.__deadline = deadline
+
+        if self.__time_schedule and time_limit is None:
+            raise ValueError("time_schedule requires time_limit or deadline.")
+
+        self.__time_limit = time_limit
+        self.__start_time = timeit.default_timer()
+        self._cancelled = False
 
         best_state = kwargs.get("best_state", None)
 
         if best_state:
             self._best_state = self.copy_method(best_state)
+            self._best_energy = self.energy_method(self._best_state)
         else:
             self._best_state = self.copy_method(self._state)
+            self._best_energy = self._energy
 
         if self.__energy_break_rounds > 1 and self.__energy_break_tol > 0:
             self.__energy_queue = deque([self.energy],
@@ -179,10 +368,257 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
         """
         pass
 
+    def propose(self, state):  # pragma: no cover
+        """Returns a random move from a given state. Optional.
+
+        Together with delta_energy and apply, this makes up the "move
+        protocol". If a subclass defines all three, anneal() uses them instead
+        of neighbor and energy_method, so that a step only costs as much as
+        evaluating the change in energy caused by the move.
+
+        A move can be any object describing a change to the state, e.g. the
+        pair of cells to swap in a Sudoku board.
+
+        Parameters
+        ----------
+        state : <>
+            The (current) state to find a move from.
+        """
+        raise NotImplementedError
+
+    def delta_energy(self, state, move):  # pragma: no cover
+        """Returns the change in energy caused by applying move to state.
+        Optional; see propose.
+
+        Parameters
+        ----------
+        state : <>
+            The (current) state.
+
+        move : <>
+            A move returned by propose(state).
+        """
+        raise NotImplementedError
+
+    def apply(self, state, move):  # pragma: no cover
+        """Applies move to state and returns the resulting state. Optional;
+        see propose.
+
+        anneal() passes a copy of the current state, so state may be modified
+        in place.
+
+        Parameters
+        ----------
+        state : <>
+            The state to apply the move to.
+
+        move : <>
+            A move returned by propose(state).
+        """
+        raise NotImplementedError
+
+    def undo(self, state, move):  # pragma: no cover
+        """Reverts move, previously applied to state, and returns the
+        resulting state. Optional.
+
+        Defining undo (along with propose and apply) switches anneal() to
+        "in-place" mode: apply is then called on the current state itself
+        rather than on a copy, and undo is called if the move is rejected.
+        States are only copied when a new best state is found. (If
+        delta_energy is also defined, moves are only applied once accepted,
+        so undo is never actually called.)
+
+        Parameters
+        ----------
+        state : <>
+            The state move was applied to.
+
+        move : <>
+            A move returned by propose(state).
+        """
+        raise NotImplementedError
+
+    def moves(self, state):  # pragma: no cover
+        """Returns a list of every move that can be made from a given state.
+        Optional.
+
+        Together with delta_energy and apply, this allows anneal() to be run
+        with rejection_free=True. The list is only asked for once per run, so
+        it must hold the same moves whatever the state (moves which don't
+        change the state should have a delta_energy of 0).
+
+        Parameters
+        ----------
+        state : <>
+            The (initial) state.
+        """
+        raise NotImplementedError
+
+    def affected_moves(self, state, move):
+        """Returns the indices (into the list returned by moves) of the moves
+        whose delta_energy may have been changed by applying move to state.
+        Optional.
+
+        This is used in rejection-free mode, where the change in energy of
+        every move is kept up to date after each step. By default, all moves
+        are taken to be affected, which makes a step cost as much as
+        evaluating every move.
+
+        Parameters
+        ----------
+        state : <>
+            The state move has just been applied to.
+
+        move : <>
+            One of the moves returned by moves.
+        """
+        return range(len(self.__moves))
+
+    def _overrides(self, name):
+        """True if the subclass defines its own version of a given method."""
+        return getattr(type(self), name) is not getattr(BaseAnnealer, name)
+
+    @property
+    def uses_moves(self):
+        """True if the subclass implements the move protocol, i.e. propose and
+        apply, along with delta_energy and/or undo."""
+        return (self._overrides("propose") and self._overrides("apply") and
+                (self._overrides("delta_energy") or self._overrides("undo")))
+
+    @property
+    def can_enumerate_moves(self):
+        """True if the subclass defines moves, delta_energy and apply, as
+        needed by rejection-free mode."""
+        return (self._overrides("moves") and
+                self._overrides("delta_energy") and self._overrides("apply"))
+
+    @property
+    def in_place(self):
+        """True if moves are applied to the current state in place (i.e. the
+        subclass implements the move protocol, including undo)."""
+        return self.uses_moves and self._overrides("undo")
+
+    @property
+    def schedule(self):
+        """The schedules.Schedule anneal() follows (or last followed)."""
+        return self.__schedule
+
+    def _make_schedule(self, schedule):
+        """Returns the schedules.Schedule to use for a given schedule option:
+        temperature, wrapped in a schedule, if it's None (or the equivalent
+        schedules.Linear(), if temperature hasn't been overwritten), and a
+        function of the step, wrapped in a schedule."""
+        if schedule is None:
+            if ("temperature" in vars(self) or
+                    self._overrides("temperature")):
+                return schedules.FunctionSchedule(self.temperature)
+            else:
+                return schedules.Linear()
+
+        elif isinstance(schedule, schedules.Schedule):
+            return schedule
+
+        else:
+            return schedules.FunctionSchedule(schedule)
+
+    def calibrate(self, n_samples=1000, initial_acceptance=0.8,
+                  final_acceptance=0.001, schedule=schedules.Exponential,
+                  n_jobs=None, executor=None, backend=None, seed=None):
+        """Returns a temperature schedule fitted to the energy scale of the
+        problem, to pass to anneal().
+
+        Starting from initial_state, n_samples random moves (or neighbors)
+        are made, all of them accepted, and their changes in energy are
+        recorded. The schedule then starts at the temperature at which the
+        uphill ones would be accepted at a rate of initial_acceptance, and
+        ends at the one where they would be accepted at a rate of
+        final_acceptance (see schedules.acceptance_temperature).
+
+        The annealer is reset afterwards.
+
+        Parameters
+        ----------
+        n_samples : int, optional
+            Default is 1000.
+
+            Number of moves to sample.
+
+        initial_acceptance, final_acceptance : float, optional
+            Default is 0.8 and 0.001.
+
+            Acceptance rates of uphill moves at the start and end of the
+            schedule.
+
+        schedule : type, optional
+            Default is schedules.Exponential.
+
+            Type of the schedule, called with the initial and final
+            temperatures.
+
+        n_jobs, executor, backend : optional
+            Default is None.
+
+            As for run: if any of these are given, the moves are sampled in
+            parallel, by n_jobs (by default, one per CPU) independent walks.
+
+        seed : int, optional
+            Default is None.
+
+            Seed for the parallel walks.
+        """
+        parallel = (executor is not None or n_jobs not in [None, 1] or
+                    backend is not None)
+
+        if not parallel:
+            deltas = self._sample_deltas(n_samples)
+        else:
+            if n_jobs in [None, -1]:
+                n_jobs = os.cpu_count()
+
+            sizes = [len(chunk) for chunk in
+                     np.array_split(np.arange(n_samples), n_jobs)]
+            seeds = helpers.spawn_seeds(seed, n_jobs)
+            annealers = (copy.deepcopy(self) for _ in range(n_jobs))
+
+            if executor is None:
+                with _make_executor(n_jobs, backend) as executor:
+                    chunks = list(executor.map(_sample_deltas, annealers,
+                                               seeds, sizes))
+            else:
+                chunks = list(executor.map(_sample_deltas, annealers, seeds,
+                                           sizes))
+
+            deltas = np.concatenate(chunks)
+
+        return schedule(
+                schedules.acceptance_temperature(deltas, initial_acceptance),
+                schedules.acceptance_temperature(deltas, final_acceptance))
+
+    def _sample_deltas(self, n_samples):
+        """Makes n_samples random moves from initial_state, accepting all of
+        them, and returns their changes in energy. (The annealer is reset
+        before and after.)"""
+        self._reset()
+        take_step = self._step_method()
+        deltas = np.empty(n_samples)
+
+        for i in range(n_samples):
+            energy = self._energy
+
+            # every move is accepted at infinite temperature
+            take_step(math.inf)
+            deltas[i] = self._energy - energy
+
+        self._reset()
+
+        return deltas
+
     def temperature(self, step):
         """Defines the temperature/annealing schedule for the problem.
 
-        This method may be overwritten in a subclass if desired.
+        This method may be overwritten in a subclass if desired, though
+        passing a schedules.Schedule to anneal() is faster, since it can be
+        precomputed.
 
         Parameters
         ----------
@@ -191,31 +627,38 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
         """
         return 1 - step/self.max_steps
 
-    def _acceptance_probability(self, state, temp):
-        """Probability of moving from the current state to the new state.
+    def _accept_state(self, delta, temp):
+        """Returns True if a move changing the energy by delta is accepted at
+        temperature temp, by the Metropolis criterion: downhill moves are
+        always accepted, and uphill moves with probability exp(-delta/temp)
+        (never at a temperature of zero).
 
-        As temp goes to zero, this should go to zero for E_new > E_old.
+        The comparison is made in log space, against the log of a uniform
+        random number, so that it can't overflow or divide by zero at the
+        extremes of a schedule.
         """
-        return math.exp(-(self.energy_method(state) -
-                          self.energy_method(self.state))
-                        / temp)
-
-    def _accept_state(self, state):
-        """Returns True if the given state is accepted."""
-        try:
-            temp = self.temperature(self.step)
-            p = self._acceptance_probability(state, temp)
+        if temp == 0:
+            return delta < 0
+        elif delta <= 0:
+            return True
+        else:
+            u = self.uniform()
+            return u == 0 or -delta / temp >= math.log(u)
 
-            if p >= 1 or p >= random.random():
-                return True
-            else:
-                return False
+    def is_optimal(self, energy):
+        """Returns True if energy is good enough for anneal() to stop. This may
+        be overwritten, e.g. if the optimal energy of a problem is known.
 
-        except OverflowError:
-            return True
+        By default, this compares energy to the target_energy given to
+        anneal() (if any).
 
-        except ZeroDivisionError:
-            return self.energy_method(state) < self.energy_method(self.state)
+        Parameters
+        ----------
+        energy : float
+            The energy of a (new) best state.
+        """
+        return (self.__target_energy is not None and
+                energy <= self.__target_energy)
 
     def format_output(self, output):
         """Function for processing the output of anneal. May be overwritten if
@@ -295,23 +738,267 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
         with open(pickle_file, mode) as file:
             pickle.dump(self.state, file)
 
+    def iter_records(self, filename=None, start=0, stop=None, step=1,
+                     last=None):
+        """Lazily yields the trajectory.Records found in a given pickle file,
+        so that long trajectories can be gone through in constant memory. If
+        no filename is provided, iter_records() will try to unpickle the
+        latest file pickled by anneal.
+
+        (Bare states, as written by pickle_state, are yielded as Records with
+        only the state filled in.)
+
+        Parameters
+        ----------
+        filename : str, optional
+            Default is None.
+
+            File to unpickle.
+
+        start, stop, step : int, optional
+            Default is 0, None and 1.
+
+            Only the records that a slice [start:stop:step] of the whole
+            trajectory would contain are yielded.
+
+        last : int, optional
+            Default is None.
+
+            If given, only the last last records (of those selected by start,
+            stop and step) are yielded.
+        """
+        objects = helpers.iter_pickled_objects(self._trajectory_file(filename),
+                                               start, stop, step, last)
+
+        for obj in objects:
+            yield trajectory.as_record(obj)
+
+    def iter_states(self, filename=None, start=0, stop=None, step=1,
+                    last=None):
+        """Lazily yields the states found in a given pickle file. Takes the
+        same parameters as iter_records."""
+        for record in self.iter_records(filename, start, stop, step, last):
+            yield record.state
+
+    def unpickle_records(self, filename=None):
+        """Returns the list of trajectory.Records found in a given pickle file.
+        If no filename is provided, unpickle_records() will try to unpickle
+        the latest file pickled by anneal.
+        """
+        return list(self.iter_records(filename))
+
     def unpickle_states(self, filename=None):
         """Returns a list of states found in a given pickle file. If no
         filename is provided, unpickle_states() will try to unpickle the
         latest file pickled by anneal.
         """
-        if not filename:
-            if self.last_pickle is not None:
-                filename = self.last_pickle
-            else:
-                raise FileNotFoundError(
-                    "Could not find anything to unpickle. Try first running "
-                    "anneal() with pickle=True, or run unpickle_states() with "
-                    "a filename specified.")
+        return list(self.iter_states(filename))
+
+    def load_states(self, filename=None):
+        """Returns the states of a trajectory recorded with record_format set
+        to "npy", as a read-only numpy.memmap of shape (n_records, *shape),
+        so nothing is loaded until it's used. If no filename is provided,
+        load_states() will use the latest trajectory recorded by anneal.
+        """
+        return trajectory.load_states(self._trajectory_file(filename))
+
+    def load_records(self, filename=None):
+        """Returns the step, energy and temperature of each state of a
+        trajectory recorded with record_format set to "npy", as a read-only
+        structured numpy.memmap (see trajectory.COLUMNS). If no filename is
+        provided, load_records() will use the latest trajectory recorded by
+        anneal.
+        """
+        return trajectory.load_records(self._trajectory_file(filename))
+
+    def _trajectory_file(self, filename):
+        """Returns filename if given, and the last file pickled to
+        otherwise."""
+        if filename:
+            return filename
+        elif self.last_pickle is not None:
+            return self.last_pickle
+        else:
+            raise FileNotFoundError(
+                "Could not find a trajectory to load. Try first running "
+                "anneal() with pickle=True, or specify a filename.")
+
+    def _neighbor_step(self, temp):
+        """Tries moving to a neighbor of the current state (generated by
+        neighbor) at temperature temp. Returns True if the neighbor is
+        accepted."""
+        neighbor = self.neighbor(self.copy_method(self.state))
+        new_energy = self.energy_method(neighbor)
+
+        if self._accept_state(new_energy - self._energy, temp):
+            # neighbor was made from a copy, so it's safe to keep as it is
+            self._state = neighbor
+            self._energy = new_energy
+            return True
+        else:
+            return False
 
-        states = helpers.unpickle_objects(filename)
+    def _move_step(self, temp):
+        """Tries a move given by propose at temperature temp. Returns True if
+        the move is accepted.
 
-        return states
+        The energy is updated incrementally, so energy_method is never called.
+        """
+        move = self.propose(self.state)
+        delta = self.delta_energy(self.state, move)
+
+        if self._accept_state(delta, temp):
+            self._state = self.apply(self.copy_method(self.state), move)
+            self._energy += delta
+            return True
+        else:
+            return False
+
+    def _in_place_step(self, temp):
+        """Tries a move given by propose at temperature temp, applying it to
+        the current state without copying it, once it's accepted according
+        to delta_energy. Returns True if the move is accepted."""
+        move = self.propose(self._state)
+        delta = self.delta_energy(self._state, move)
+
+        if self._accept_state(delta, temp):
+            self._state = self.apply(self._state, move)
+            self._energy += delta
+            return True
+        else:
+            return False
+
+    def _undo_step(self, temp):
+        """Tries a move given by propose at temperature temp, applying it to
+        the current state without copying it, and undoing it if the energy
+        of the result isn't accepted (for subclasses without delta_energy).
+        Returns True if the move is accepted."""
+        move = self.propose(self._state)
+        self._state = self.apply(self._state, move)
+        new_energy = self.energy_method(self._state)
+
+        if self._accept_state(new_energy - self._energy, temp):
+            self._energy = new_energy
+            return True
+        else:
+            self._state = self.undo(self._state, move)
+            return False
+
+    def _start_rejection_free(self):
+        """Lists the moves from the current state and their changes in
+        energy, for _rejection_free_step."""
+        self.__moves = list(self.moves(self._state))
+
+        # the changes in energy as given by delta_energy, which are added to
+        # the energy (so that it keeps its type), and as an array of floats
+        self.__delta_values = [self.delta_energy(self._state, move)
+                               for move in self.__moves]
+        self.__deltas = np.array(self.__delta_values, dtype=float)
+
+        # weights of the moves, as of the temperature weights_temp (if it
+        # isn't None, e.g. after a checkpoint is restored)
+        self.__weights = helpers.SumTree(np.zeros(len(self.__moves)))
+
+        if self.__weights_temp is not None:
+            self.__weights.rebuild(self._move_weights(self.__deltas,
+                                                      self.__weights_temp))
+
+    @staticmethod
+    def _move_weights(deltas, temp):
+        """Metropolis acceptance probabilities of moves changing the energy by
+        an array of deltas, at temperature temp."""
+        if temp > 0:
+            return np.exp(-np.maximum(deltas, 0) / temp)
+        else:
+            return (deltas <= 0).astype(float)
+
+    def _rejection_free_step(self, temp, in_place=False):
+        """Picks one of the moves listed by moves, with probability
+        proportional to its acceptance probability at temperature temp, and
+        applies it (this is the "n-fold way" of Bortz, Kalos and Lebowitz),
+        to the current state itself if in_place. Returns False, without
+        moving, if no move can be accepted.
+
+        The weights of all moves are recomputed when temp has changed by more
+        than rejection_free_tol since they last were; otherwise, only those of
+        the moves returned by affected_moves are.
+        """
+        weights_temp = self.__weights_temp
+
+        if (weights_temp is None or
+                abs(temp - weights_temp) > self.rejection_free_tol *
+                weights_temp):
+            self.__weights.rebuild(self._move_weights(self.__deltas, temp))
+            self.__weights_temp = weights_temp = temp
+
+        if self.__weights.total <= 0:
+            return False
+
+        i = self.__weights.sample(self.uniform())
+        move = self.__moves[i]
+
+        if in_place:
+            self._state = self.apply(self._state, move)
+        else:
+            self._state = self.apply(self.copy_method(self._state), move)
+
+        self._energy += self.__delta_values[i]
+
+        affected = np.fromiter(self.affected_moves(self._state, move),
+                               dtype=np.intp)
+        delta_values = self.__delta_values
+
+        for j in affected:
+            delta_values[j] = self.delta_energy(self._state, self.__moves[j])
+
+        deltas = np.array([delta_values[j] for j in affected], dtype=float)
+        self.__deltas[affected] = deltas
+        self.__weights.update(affected,
+                              self._move_weights(deltas, weights_temp))
+
+        return True
+
+    def _step_method(self):
+        """Returns the method anneal() should use to take a step."""
+        if self.__rejection_free:
+            self._start_rejection_free()
+            return functools.partial(self._rejection_free_step,
+                                     in_place=self.in_place)
+        elif self.in_place and self._overrides("delta_energy"):
+            return self._in_place_step
+        elif self.in_place:
+            return self._undo_step
+        elif self.uses_moves:
+            return self._move_step
+        else:
+            return self._neighbor_step
+
+    def _sweep(self, temp, n_steps):
+        """Takes n_steps steps at a fixed temperature temp, carrying on from
+        the current state, and returns the energy of the state it ends up in.
+
+        This is what the replicas of a ParallelTemperingAnnealer use in place
+        of anneal().
+        """
+        take_step = self._step_method()
+
+        for _ in range(n_steps):
+            if take_step(temp):
+                self._handle_best()
+
+            self._step += 1
+
+        return self._energy
+
+    def _handle_best(self):
+        """Updates best_state if the current state improves on it. Returns
+        True if it does."""
+        if self._energy < self._best_energy:
+            self._best_state = self.copy_method(self._state)
+            self._best_energy = self._energy
+            return True
+        else:
+            return False
 
     def _energy_break(self):
         """Tests whether conditions for an energy break are met."""
@@ -322,14 +1009,126 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
         else:
             return False
 
-    def _temp_break(self):
-        """Tests whether conditions for a temperature break are met."""
-        return abs(self.temperature(self.step - 1) -
-                   self.temperature(self.step)) < self.__temp_tol
+    def _check_stop(self):
+        """Returns the type of exit if anneal() has been cancelled or has run
+        out of time, and None otherwise."""
+        if self._cancelled or (self._cancel_event is not None and
+                               self._cancel_event.is_set()):
+            return "cancel"
+        elif (self.__time_limit is not None and
+              self.elapsed >= self.__time_limit):
+            return "time" if self.__deadline is None else "deadline"
+        else:
+            return None
 
-    def _handle_pickle(self, append=False):
+    def _time_step(self):
+        """Step of the schedule corresponding to the fraction of the time limit
+        that has elapsed (for time_schedule)."""
+        step = int(self.elapsed / self.__time_limit * self.max_steps)
+        return min(max(step, 0), self.max_steps - 1)
+
+    def _start_recording(self, trajectory_position=None):
+        """Opens the file the trajectory is pickled to (if pickle is set) and
+        records the first state. If resuming from a checkpoint, the
+        trajectory is instead continued from the position it was at in the
+        checkpoint."""
         if self.__pickle:
-            self.pickle_state(self.__pickle_file, append)
+            if self.__record_format == "npy":
+                recorder = trajectory.ArrayRecorder
+                suffix = ".trajectory"
+            else:
+                recorder = trajectory.PickleRecorder
+                suffix = ".pickle"
+
+            if trajectory_position is not None:
+                pickle_file, resume_at = trajectory_position
+            else:
+                pickle_file, resume_at = self.__pickle_file, None
+
+            if pickle_file is None:
+                pickle_file = helpers.generate_filename(self, suffix)
+
+            self.__last_pickle = pickle_file
+            self.__recorder = recorder(pickle_file,
+                                       buffer_size=self.__record_buffer,
+                                       resume_at=resume_at)
+
+            if resume_at is None:
+                self._handle_pickle(self.step, None)
+
+    def _stop_recording(self):
+        """Writes out the rest of the trajectory and closes its file."""
+        if self.__recorder is not None:
+            self.__recorder.close()
+            self.__recorder = None
+
+    def _handle_pickle(self, step, temp):
+        """Records the current state, reached after step steps at temperature
+        temp."""
+        if self.__recorder is not None:
+            self.__recorder.record(step, self._energy, temp, self._state)
+
+    def _checkpoint(self, args, kwargs, schedule_step):
+        """Saves everything needed to resume anneal() from the current step
+        (including the state of rng, and of the global random number
+        generators, in case the subclass uses them) to
+        checkpoint_file, replacing the previous checkpoint atomically."""
+        if self.__checkpoint_file is None:
+            self.__checkpoint_file = helpers.generate_filename(self,
+                                                               ".checkpoint")
+
+        if self.__recorder is not None:
+            trajectory_position = (self.last_pickle,
+                                   self.__recorder.position())
+        else:
+            trajectory_position = None
+
+        if self.__energy_queue is not None:
+            energy_queue = list(self.__energy_queue)
+        else:
+            energy_queue = None
+
+        checkpoint = dict(args=args,
+                          kwargs=kwargs,
+                          step=self._step,
+                          schedule_step=schedule_step,
+                          state=self._state,
+                          energy=self._energy,
+                          best_state=self._best_state,
+                          best_energy=self._best_energy,
+                          energy_queue=energy_queue,
+                          rng_state=self.rng.bit_generator.state,
+                          uniforms=list(self._uniforms),
+                          random_state=random.getstate(),
+                          np_random_state=np.random.get_state(),
+                          weights_temp=self.__weights_temp,
+                          trajectory_position=trajectory_position)
+
+        helpers.pickle_atomically(checkpoint, self.__checkpoint_file)
+        self.__last_checkpoint = self.__checkpoint_file
+
+    def _restore(self, checkpoint):
+        """Restores the annealer to where it was when a given checkpoint was
+        written (after it has been reset with the same options)."""
+        self._step = checkpoint["step"]
+        self._state = checkpoint["state"]
+        self._energy = checkpoint["energy"]
+        self._best_state = checkpoint["best_state"]
+        self._best_energy = checkpoint["best_energy"]
+
+        if self.__energy_queue is not None:
+            self.__energy_queue.clear()
+            self.__energy_queue.extend(checkpoint["energy_queue"])
+
+        self.rng.bit_generator.state = checkpoint["rng_state"]
+        self._uniforms = list(checkpoint["uniforms"])
+        random.setstate(checkpoint["random_state"])
+        np.random.set_state(checkpoint["np_random_state"])
+
+        # the weights of the moves in rejection-free mode are recomputed at
+        # the temperature they were last computed at (see
+        # _start_rejection_free), as they were at the checkpoint
+        self.__weights_temp = checkpoint["weights_temp"]
 
     def _handle_energy_queue(self, energy):
         """Tests if given energy should be added to the queue (in other words,
@@ -349,8 +1148,17 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
                                   self.__energy_break_tol),
                 "temp": "Reached temperature tolerance (tol = {})."
                         .format(self.__temp_tol),
+                "schedule": "Reached end of schedule ({!r})."
+                            .format(self.__schedule),
                 "max_steps": "Reached max steps (max_steps = {})."
-                             .format(self.max_steps)
+                             .format(self.max_steps),
+                "target": "Reached target energy (best energy = {})."
+                          .format(self.best_energy),
+                "time": "Reached time limit (time_limit = {:.6g} s)."
+                        .format(self.__time_limit or 0),
+                "deadline": "Reached deadline (deadline = {:.6f})."
+                            .format(self.__deadline or 0),
+                "cancel": "Cancelled."
                 }
 
         self.__last_exit = messages[exit]
@@ -394,7 +1202,9 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
             Default is False.
 
             Pickle the intermediate steps and write to a file, optionally given
-            by the pickle_file keyword argument.
+            by the pickle_file keyword argument. Each is written as a
+            trajectory.Record, which also holds the step, energy and
+            temperature. (See unpickle_states and unpickle_records.)
 
         pickle_file : str, optional
             Default is None.
@@ -403,6 +1213,27 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
             a timestamp will be used as the filename with the class name
             as a prefix.
 
+        record_every : int, optional
+            Default is None.
+
+            If given, the current state is pickled every record_every steps
+            (whether or not it has changed), rather than every time a new
+            state is accepted.
+
+        record_buffer : int, optional
+            Default is 1000.
+
+            Number of pickled states to keep in memory before writing them to
+            pickle_file.
+
+        record_format : str, optional
+            Default is "pickle".
+
+            Either "pickle" or "npy". With "npy", which needs states to be
+            NumPy arrays of a fixed shape, pickle_file is a directory the
+            states and their step, energy and temperature are written to as
+            .npy files (see load_states and load_records).
+
         energy_break_rounds : int, optional
             Default is -1.
 
@@ -426,62 +1257,483 @@ class BaseAnnealer(metaclass=abc.ABCMeta):
             If the change in temperature becomes smaller than this, the program
             will abort.
 
+        schedule : schedules.Schedule, optional
+            Default is None.
+
+            Temperature schedule to follow instead of temperature, e.g.
+            schedules.Exponential(10, 0.01). Its temperatures are computed
+            with NumPy, Schedule.chunk_size steps at a time, and if it ends
+            before max_steps, so does the program. Adaptive schedules, such as
+            schedules.ModifiedLam(), instead adjust the temperature after
+            every step (and temp_tol doesn't apply to them). A function of
+            the step may also be given, and a schedules.TimeBased schedule is
+            the same as setting time_limit and time_schedule.
+
+        target_energy : float, optional
+            Default is None.
+
+            If given, the program will stop as soon as the best energy is at
+            most target_energy (or, more generally, as soon as is_optimal
+            returns True for it).
+
+        time_limit : float, optional
+            Default is None.
+
+            Time (in seconds) after which the program will stop, returning
+            the best state found so far.
+
+        deadline : float, optional
+            Default is None.
+
+            Time (as given by time.time()) at which the program will stop, as
+            for time_limit.
+
+        check_interval : int, optional
+            Default is 100.
+
+            Number of steps between checks of the time (and of whether cancel
+            has been called).
+
+        time_schedule : bool, optional
+            Default is False.
+
+            If True, the temperature follows the fraction of the time limit
+            that has elapsed rather than the fraction of max_steps taken:
+            temperature is given the step that fraction corresponds to. (So
+            max_steps should be set high enough not to be reached first.)
+            Requires time_limit or deadline.
+
+        checkpoint_every : int, optional
+            Default is None.
+
+            If given, everything needed to resume the program is saved to
+            checkpoint_file every checkpoint_every steps (see resume_from).
+            This includes the options given to anneal, so they must be
+            picklable (a schedule can't be a lambda or a local function).
+            Parallel runs of run() can't be checkpointed.
+
+        checkpoint_file : str, optional
+            Default is None.
+
+            File to save checkpoints to. Each checkpoint is first written to
+            a temporary file, which then replaces the previous one, so a crash
+            never leaves a partial checkpoint behind. If not specified, a
+            timestamp will be used as the filename with the class name as a
+            prefix (or, when resuming, the checkpoint resumed from is used).
+
+        resume_from : str, optional
+            Default is None.
+
+            Checkpoint file to resume from. The program then continues from
+            the step the checkpoint was taken at, with the options it was
+            started with (other options given now take precedence), and
+            carries on exactly as the original run did, unless time_schedule
+            is set. A pickled trajectory is continued from that step too.
+
+        rejection_free : bool, optional
+            Default is False.
+
+            If True, every step makes a move, picked from all the moves given
+            by moves with probability proportional to its chance of being
+            accepted (so steps count accepted moves rather than attempts). The
+            acceptance probabilities of the moves are kept in a
+            helpers.SumTree, and only those of the moves returned by
+            affected_moves are updated after a move. This is much faster than
+            the usual steps when most moves would be rejected, e.g. at low
+            temperatures. Requires moves, delta_energy and apply.
+
         Returns
         -------
         (<>, float)
             This is (best_state, best_energy).
         """
+        resume_from = kwargs.pop("resume_from", None)
+        checkpoint = None
+
+        if resume_from is not None:
+            with open(resume_from, 'rb') as file:
+                checkpoint = pickle.load(file)
+
+            args = checkpoint["args"]
+            kwargs = dict(checkpoint["kwargs"], **kwargs)
+
+            if kwargs.get("checkpoint_file") is None:
+                kwargs["checkpoint_file"] = resume_from
+
         self._reset(*args, **kwargs)
+        adaptive = isinstance(self.__schedule, schedules.AdaptiveSchedule)
+
+        # the options are saved in every checkpoint, so they're checked
+        # before the run starts rather than at the first checkpoint
+        if self.__checkpoint_every is not None:
+            try:
+                pickle.dumps((args, kwargs))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                raise ValueError("The options of a checkpointed run must "
+                                 "be picklable (e.g. the schedule can't be a "
+                                 "lambda): {}".format(e)) from e
+
+        if checkpoint is not None:
+            self._restore(checkpoint)
+
+            # (an adaptive schedule resumed from a checkpoint carries on from
+            # where it was when the checkpoint was written)
+            if adaptive:
+                self.__schedule.resume(self)
+
+            trajectory_position = checkpoint["trajectory_position"]
+            schedule_step = checkpoint["schedule_step"]
+        else:
+            if adaptive:
+                self.__schedule.start(self, self.max_steps)
+
+            trajectory_position = None
+            schedule_step = 0
+
+        try:
+            self._start_recording(trajectory_position)
+            self._anneal(args, kwargs, schedule_step)
+        finally:
+            self._stop_recording()
+
+            if adaptive:
+                self.__schedule.finish(self)
+
+        return self.format_output((self.best_state, self.best_energy))
+
+    def _anneal(self, args, kwargs, schedule_step):
+        """Main loop of anneal(), run after the annealer has been reset (args
+        and kwargs are those given to anneal, for checkpoints)."""
+        take_step = self._step_method()
+
+        if self.is_optimal(self._best_energy):
+            self._handle_exit("target")
+            return
+
+        # with record_every, the state is recorded every record_every steps;
+        # otherwise, every accepted state is recorded
+        record_every = self.__record_every
+
+        checkpoint_every = self.__checkpoint_every
+
+        # the temperature at each step is looked up in a table, which also
+        # finds the step at which a temperature break occurs (as temps.stop)
+        temps = self.__schedule.table(
+                self.max_steps,
+                self.__temp_tol if self.__temp_tol > 0 else None)
+        schedule_end = self.__schedule.length(self.max_steps)
 
-        # pickle first state
-        self._handle_pickle(append=False)
+        if isinstance(self.__schedule, schedules.AdaptiveSchedule):
+            adapt = self.__schedule.update
+        else:
+            adapt = None
+
+        if schedule_end >= self.max_steps:
+            schedule_end = math.inf
+        elif schedule_step >= schedule_end:
+            self._handle_exit("schedule")
+            return
 
-        for _ in range(self.max_steps):
+        # schedule_step is the step of the temperature schedule; this is the
+        # same as self.step, unless time_schedule is set
+        for _ in range(self._step, self.max_steps):
             self._handle_debug()
 
-            neighbor = self.neighbor(self.copy_method(self.state))
+            temp = temps[schedule_step]
+            accepted = take_step(temp)
 
-            if self._accept_state(neighbor):
-                new_energy = self.energy_method(neighbor)
+            if adapt is not None:
+                adapt(self, schedule_step, accepted)
 
-                if new_energy < self.best_energy:
-                    self._best_state = self.copy_method(neighbor)
+            if accepted:
+                improved = self._handle_best()
+                self._handle_energy_queue(self._energy)
 
-                self._state = self.copy_method(neighbor)
+                if record_every is None:
+                    self._handle_pickle(self.step + 1, temp)
 
-                self._handle_pickle(append=True)
-                self._handle_energy_queue(new_energy)
+                if improved and self.is_optimal(self._best_energy):
+                    self._handle_exit("target")
+                    break
 
                 if self._energy_break():
                     self._handle_exit("energy")
                     break
 
-            if self._temp_break():
+            if schedule_step >= temps.stop:
                 self._handle_exit("temp")
                 break
 
             self._step += 1
 
+            if record_every is not None and self._step % record_every == 0:
+                self._handle_pickle(self.step, temp)
+
+            # checking the clock every step would be too expensive
+            if self._step % self.__check_interval == 0:
+                stop = self._check_stop()
+
+                if stop is not None:
+                    self._handle_exit(stop)
+                    break
+
+                if self.__time_schedule:
+                    schedule_step = self._time_step()
+
+            if not self.__time_schedule:
+                schedule_step = self._step
+
+            if schedule_step >= schedule_end:
+                self._handle_exit("schedule")
+                break
+
+            if (checkpoint_every is not None and
+                    self._step % checkpoint_every == 0):
+                self._checkpoint(args, kwargs, schedule_step)
+
         else:
             self._handle_exit("max_steps")
 
-        return self.format_output((self.best_state, self.best_energy))
-
-    def run(self, n_runs, *args, **kwargs):
+    def run(self, n_runs, *args, executor=None, n_jobs=None, backend=None,
+            seed=None, **kwargs):
         """Run anneal method multiple times with a given set of parameters.
         (*args and **kwargs will be passed to anneal.)
 
+        By default, the runs are done one after another on this annealer. If
+        any of executor, n_jobs or backend are given, the runs are done in
+        parallel instead, each on its own copy of the annealer. Either way,
+        the results are returned in the order the runs were started, and are
+        also available (along with exit reasons and timings) via last_runs.
+
         Parameters
         ----------
         n_runs : int
             Number of times to run anneal.
+
+        executor : concurrent.futures.Executor, optional
+            Default is None.
+
+            Executor to submit the runs to. It is not shut down afterwards.
+
+        n_jobs : int, optional
+            Default is None.
+
+            Number of workers to create if no executor is given. -1 means one
+            per CPU.
+
+        backend : str, optional
+            Default is None.
+
+            Either "process" or "thread"; the kind of workers to create if no
+            executor is given. Defaults to "process" when running in parallel.
+            (Runs of the "thread" backend can only be reproduced with seed if
+            the subclass doesn't use the global random number generators.)
+
+        seed : int, optional
+            Default is None.
+
+            If given, an independent seed is derived from it for each run, and
+            the annealer (see reseed), along with the random and numpy.random
+            generators, is reseeded with it before the run starts. Parallel
+            runs are always given their own seeds (so that processes don't all
+            start with the same random state).
+
+        If a deadline is given (see anneal), no more runs are started once it
+        has passed, so there may be fewer than n_runs results.
         """
-        states = []
-        energies = []
+        parallel = (executor is not None or n_jobs not in [None, 1] or
+                    backend is not None)
+
+        if seed is not None or parallel:
+            seeds = helpers.spawn_seeds(seed, n_runs)
+        else:
+            seeds = [None] * n_runs
+
+        if not parallel:
+            results = []
+            self._run_cancelled = False
+
+            for s in seeds:
+                result = _run_once(self, s, args, kwargs)
+
+                if result is None:
+                    break
+
+                results.append(result)
+
+                if self._run_cancelled:
+                    break
+
+        else:
+            if kwargs.get("pickle", self.defaults["pickle"]):
+                raise ValueError("Parallel runs can't be pickled, since they "
+                                 "would all write to the same file.")
+
+            if kwargs.get("checkpoint_every",
+                          self.defaults["checkpoint_every"]) is not None:
+                raise ValueError("Parallel runs can't be checkpointed, since "
+                                 "they would all write to the same file.")
+
+            # keep this annealer's parameters in line with the serial case
+            self._reset(*args, **kwargs)
+
+            if executor is None:
+                with _make_executor(n_jobs, backend,
+                                    cancellable=True) as executor:
+                    results = self._run_parallel(executor, seeds, args,
+                                                 kwargs)
+            else:
+                results = self._run_parallel(executor, seeds, args, kwargs)
+
+        self.__last_runs = results
+
+        return [r.state for r in results], [r.energy for r in results]
+
+    def _run_parallel(self, executor, seeds, args, kwargs):
+        """Submits a run of a copy of the annealer to executor for each seed,
+        and returns the RunResults of those which weren't cancelled (see
+        cancel) or skipped (after the deadline), in order."""
+        control = self.__run_control
+
+        if isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+            event = threading.Event()
+            passed_event = event
+        else:
+            # (the workers of a process executor made by _make_executor
+            # already have its event)
+            event = getattr(executor, "cancel_event", None)
+            passed_event = None
+
+        control.start(event)
+        self._run_cancelled = False
+
+        try:
+            for seed in seeds:
+                if self._run_cancelled:
+                    break
+
+                control.futures.append(executor.submit(
+                        _run_once, copy.deepcopy(self), seed, args, kwargs,
+                        passed_event))
+
+            results = []
+
+            for future in control.futures:
+                try:
+                    result = future.result()
+                except concurrent.futures.CancelledError:
+                    continue
+
+                if result is not None:
+                    results.append(result)
+
+        finally:
+            control.finish()
+
+        return results
+
+
+def _run_once(annealer, seed, args, kwargs, cancel_event=None):
+    """Runs annealer.anneal(*args, **kwargs) and returns a RunResult. (Used by
+    BaseAnnealer.run; defined at the module level so it can be pickled.)
+
+    The run is cancelled once cancel_event (by default, the event given to
+    the worker process by _make_executor, if any) is set. If the deadline in
+    kwargs has already passed, the run isn't started, and None is returned.
+    """
+    deadline = kwargs.get("deadline", annealer.defaults["deadline"])
+
+    if deadline is not None and time.time() >= deadline:
+        return None
+
+    annealer._cancel_event = (cancel_event if cancel_event is not None else
+                              _worker_cancel_event)
+
+    if seed is not None:
+        annealer.reseed(seed)
+
+        # for subclasses using the global generators
+        random.seed(seed)
+        np.random.seed(seed)
+
+    start = timeit.default_timer()
+    state, energy = annealer.anneal(*args, **kwargs)
+    end = timeit.default_timer()
+
+    return RunResult(state, energy, annealer.last_exit, end - start, seed)
+
+
+def _sample_deltas(annealer, seed, n_samples):
+    """Reseeds annealer and returns annealer._sample_deltas(n_samples). (Used
+    by BaseAnnealer.calibrate; defined at the module level so it can be
+    pickled.)
+    """
+    annealer.reseed(seed)
+    return annealer._sample_deltas(n_samples)
+
+
+def _make_executor(n_jobs=None, backend=None, cancellable=False):
+    """Creates an executor with n_jobs workers of the given backend. If
+    cancellable, the workers of a process executor are given an Event (see
+    _run_once), which is also kept as its cancel_event attribute."""
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if backend in [None, "process"]:
+        if not cancellable:
+            return concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs)
+
+        # the event can only reach the workers as they're created
+        cancel_event = multiprocessing.Event()
+        executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_set_worker_cancel_event,
+                initargs=(cancel_event,))
+        executor.cancel_event = cancel_event
+
+        return executor
+    elif backend == "thread":
+        return concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs)
+    else:
+        raise ValueError("backend must be either 'process' or 'thread'.")
+
+
+# event which cancels the runs of this worker process (see _make_executor)
+_worker_cancel_event = None
+
+
+def _set_worker_cancel_event(event):  # pragma: no cover
+    global _worker_cancel_event
+    _worker_cancel_event = event
+
+
+class _RunControl:
+    """Lets cancel() reach the parallel runs of a run() in progress: it holds
+    their futures, and the event they check (if they can be reached).
+
+    Copies of it, such as those of the annealers run in parallel, are blank.
+    """
+
+    def __init__(self):
+        self.futures = []
+        self.event = None
+
+    def __deepcopy__(self, memo):
+        return _RunControl()
+
+    def __reduce__(self):
+        return _RunControl, ()
+
+    def start(self, event):
+        self.futures = []
+        self.event = event
+
+    def cancel(self):
+        if self.event is not None:
+            self.event.set()
 
-        for _ in range(n_runs):
-            s, e = self.anneal(*args, **kwargs)
-            states.append(s)
-            energies.append(e)
+        for future in list(self.futures):
+            future.cancel()
 
-        return states, energies
+    def finish(self):
+        self.futures = []
+        self.event = None
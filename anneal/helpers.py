@@ -1,9 +1,13 @@
 import copy
+import itertools
 import math
 import numpy as np
+import os
 import pickle
+import tempfile
 import time
 import timeit
+from collections import deque
 
 
 def clip(item, lower, upper):
@@ -19,6 +23,145 @@ def distance(p1, p2):
     return np.linalg.norm(r1 - r2)
 
 
+def spawn_seeds(seed, n):
+    """Returns a list of n independent integer seeds derived from seed (or from
+    fresh entropy, if seed is None). seed may also be a SeedSequence.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    children = seed.spawn(n)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def distance_matrix(points):
+    """Returns the matrix of Euclidean distances between each pair of rows of
+    an (n, d) array of points."""
+    points = np.asarray(points, dtype=float)
+    return np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+
+
+def nearest_neighbors(points, k):
+    """Returns an (n, k) array whose i-th row holds the indices of the k points
+    closest to the i-th point of an (n, d) array of points (excluding the
+    point itself), sorted by distance.
+
+    Planar points are bucketed into a grid, so that each point is only
+    compared to the points in the cells around it; other points are compared
+    with each other in chunks.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    k = min(k, n - 1)
+
+    if k < 1:
+        return np.empty((n, 0), dtype=np.int32)
+
+    if points.ndim == 2 and points.shape[1] == 2:
+        neighbors = _grid_nearest_neighbors(points, k)
+    else:
+        neighbors = np.empty((n, k), dtype=np.int32)
+        chunk_size = 1024
+
+        for start in range(0, n, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, n))
+            dists = np.linalg.norm(points[rows, np.newaxis] - points, axis=-1)
+            dists[np.arange(len(rows)), rows] = np.inf
+            neighbors[rows] = _k_smallest(dists, k)
+
+    return neighbors
+
+
+def _k_smallest(dists, k, columns=None):
+    """Returns the (column) indices of the k smallest values in each row of
+    dists, sorted. If given, these are mapped through the array columns."""
+    nearest = np.argpartition(dists, k - 1, axis=1)[:, :k]
+    nearest_dists = np.take_along_axis(dists, nearest, axis=1)
+    nearest = np.take_along_axis(nearest, np.argsort(nearest_dists, axis=1),
+                                 axis=1)
+
+    if columns is not None:
+        nearest = columns[nearest]
+
+    return nearest
+
+
+def _grid_nearest_neighbors(points, k, max_radius=4):
+    """nearest_neighbors for planar points, using grid bucketing.
+
+    The cells are square, and there are about two points per cell. Points
+    that still have fewer than k candidates (or can't be sure of their k
+    nearest) once the ring of cells around them is max_radius cells wide,
+    e.g. isolated points of clustered inputs, are compared to all the points
+    instead.
+    """
+    n = len(points)
+
+    lower = points.min(axis=0)
+    span = points.max(axis=0) - lower
+
+    # (the cells are also at least 2/n of the longest side wide, so that very
+    # thin inputs don't get a huge number of cells)
+    cell_size = max(math.sqrt(2 * span[0] * span[1] / n),
+                    2 * span.max() / n)
+
+    if cell_size == 0:
+        cell_size = 1
+
+    shape = np.maximum(np.ceil(span / cell_size).astype(int), 1)
+    cells = np.minimum(((points - lower) / cell_size).astype(int), shape - 1)
+    keys = cells[:, 0] * shape[1] + cells[:, 1]
+
+    # the points of cell key are order[starts[key]:ends[key]]
+    order = np.argsort(keys, kind="stable")
+    all_keys = np.arange(shape.prod())
+    starts = np.searchsorted(keys[order], all_keys)
+    ends = np.searchsorted(keys[order], all_keys, side="right")
+
+    neighbors = np.empty((n, k), dtype=np.int32)
+    remaining = []
+
+    for key in np.unique(keys):
+        rows = order[starts[key]:ends[key]]
+        x, y = divmod(key, shape[1])
+
+        # any point outside the cells within radius of this one is further
+        # than radius*cell_size away from every point in it
+        for radius in range(1, max_radius + 1):
+            xs = range(max(x - radius, 0), min(x + radius + 1, shape[0]))
+            ys = range(max(y - radius, 0), min(y + radius + 1, shape[1]))
+            candidates = np.concatenate([order[starts[i * shape[1] + j]:
+                                               ends[i * shape[1] + j]]
+                                         for i in xs for j in ys])
+
+            covers_grid = len(xs) == shape[0] and len(ys) == shape[1]
+
+            if len(candidates) > k:
+                dists = np.linalg.norm(points[rows, np.newaxis] -
+                                       points[candidates], axis=-1)
+                dists[candidates[np.newaxis] == rows[:, np.newaxis]] = np.inf
+                kth = np.partition(dists, k - 1, axis=1)[:, k - 1]
+
+                if covers_grid or (kth <= radius * cell_size).all():
+                    neighbors[rows] = _k_smallest(dists, k, candidates)
+                    break
+        else:
+            remaining.append(rows)
+
+    if remaining:
+        rows = np.concatenate(remaining)
+        chunk_size = 1024
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            dists = np.linalg.norm(points[chunk, np.newaxis] - points,
+                                   axis=-1)
+            dists[np.arange(len(chunk)), chunk] = np.inf
+            neighbors[chunk] = _k_smallest(dists, k)
+
+    return neighbors
+
+
 def generate_filename(obj, extension):
     """Generates a timestamp-based filename prefixed with the class name of the
     given object.
@@ -28,18 +171,203 @@ def generate_filename(obj, extension):
     return filename
 
 
+def iter_pickled_objects(filename, start=0, stop=None, step=1, last=None):
+    """Lazily unloads the objects pickled in a given file, one at a time.
+
+    Parameters
+    ----------
+    filename : str
+        File to unpickle.
+
+    start, stop, step : int, optional
+        Default is 0, None and 1.
+
+        Only the objects that a slice [start:stop:step] of the whole list
+        would contain are yielded. (Those before start still have to be
+        unpickled, but they're discarded right away.)
+
+    last : int, optional
+        Default is None.
+
+        If given, only the last last objects (of those selected by start,
+        stop and step) are yielded. Only these are kept in memory at once.
+    """
+    with open(filename, 'rb') as file:
+        objects = itertools.islice(_iter_pickles(file), start, stop, step)
+
+        if last is not None:
+            objects = deque(objects, maxlen=last)
+
+        yield from objects
+
+
+def _iter_pickles(file):
+    """Yields the objects pickled in an open file."""
+    while True:
+        try:
+            yield pickle.load(file)
+        except EOFError:
+            return
+
+
+def pickle_atomically(obj, filename):
+    """Pickles obj to filename, so that the file either keeps its old contents
+    or holds all of obj, even if this is interrupted: obj is written to a
+    temporary file in the same directory, which then replaces filename."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_file = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(obj, file, pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_file, filename)
+
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+
 def unpickle_objects(filename):
     """Unloads the objects pickled in a given file."""
-    objects = []
+    return list(iter_pickled_objects(filename))
 
-    with open(filename, 'rb') as file:
-        while True:
-            try:
-                objects.append(pickle.load(file))
-            except EOFError:
-                break
 
-    return objects
+class RingBuffer:
+    """The last size values appended to it, along with their mean and
+    variance, all kept up to date in O(1) time per value."""
+
+    def __init__(self, size):
+        if not (isinstance(size, int) and size > 0):
+            raise ValueError("size must be a positive integer.")
+
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        self._values = [0.0] * self.size
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_of_squares = 0.0
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def append(self, value):
+        old = self._values[self._index]
+        self._values[self._index] = value
+
+        self._sum += value - old
+        self._sum_of_squares += value*value - old*old
+
+        self._index += 1
+        self._count += 1
+
+        if self._index == self.size:
+            self._index = 0
+
+            # recompute the sums once per round, so rounding errors don't
+            # build up
+            self._sum = math.fsum(self._values)
+            self._sum_of_squares = math.fsum(v*v for v in self._values)
+
+    def mean(self):
+        """Mean of the values (0 if there are none)."""
+        return self._sum / len(self) if len(self) else 0.0
+
+    def variance(self):
+        """(Population) variance of the values (0 if there are none)."""
+        n = len(self)
+
+        if not n:
+            return 0.0
+
+        mean = self._sum / n
+        return max(self._sum_of_squares / n - mean*mean, 0.0)
+
+
+class SumTree:
+    """A fixed number of non-negative weights, stored as the leaves of a
+    binary tree whose every node holds the sum of the weights below it, so an
+    index can be sampled with probability proportional to its weight in
+    O(log n) time.
+
+    Updating k weights only recomputes the sums above them, one level of the
+    tree at a time (in O(k log n) time, done with NumPy).
+    """
+
+    def __init__(self, weights):
+        self.n = len(weights)
+        self._size = 1 << (self.n - 1).bit_length()
+        self._tree = np.zeros(2 * self._size)
+        self.rebuild(weights)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return float(self._tree[self._size + index])
+
+    @property
+    def total(self):
+        """Sum of all the weights."""
+        return float(self._tree[1])
+
+    def rebuild(self, weights):
+        """Replaces all the weights."""
+        tree = self._tree
+        size = self._size
+
+        tree[size:size + self.n] = weights
+
+        while size > 1:
+            half = size // 2
+            tree[half:size] = tree[size:2*size:2] + tree[size + 1:2*size:2]
+            size = half
+
+    def update(self, indices, weights):
+        """Sets the weights at the given indices."""
+        tree = self._tree
+        nodes = np.asarray(indices, dtype=np.intp) + self._size
+
+        if not len(nodes):
+            return
+
+        tree[nodes] = weights
+
+        # (all the leaves are at the same depth, and nodes repeated in a
+        # level are just given the same sum more than once)
+        while nodes[0] > 1:
+            nodes //= 2
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def find(self, value):
+        """Returns the index i such that the sum of the weights before i is at
+        most value, and the sum up to and including i is more than value
+        (value must be in [0, total))."""
+        tree = self._tree
+        node = 1
+
+        while node < self._size:
+            node *= 2
+            left = tree[node]
+
+            # (a right child of weight zero is never picked, even if
+            # rounding errors put value past the left one)
+            if value >= left and tree[node + 1] > 0:
+                value -= left
+                node += 1
+
+        return node - self._size
+
+    def sample(self, u):
+        """Returns an index with probability proportional to its weight, given
+        a uniform random number u in [0, 1). The weights must not all be
+        zero."""
+        return self.find(u * self._tree[1])
 
 
 def timed(function):
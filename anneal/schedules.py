@@ -0,0 +1,489 @@
+import abc
+import math
+import numpy as np
+from anneal import helpers
+
+
+class Schedule(metaclass=abc.ABCMeta):
+    """A temperature schedule, giving the temperature at each step of a run of
+    a given number of steps.
+
+    anneal() doesn't call the schedule at every step: it asks for a table of
+    the temperatures of the whole run (see table), which computes them with
+    NumPy, chunk_size steps at a time, as the run gets to them.
+
+    A schedule may also end before the run does (see length); anneal() then
+    stops with a "schedule" exit.
+    """
+
+    # number of temperatures computed at once by table
+    chunk_size = 4096
+
+    @abc.abstractmethod
+    def temperatures(self, steps, n_steps):  # pragma: no cover
+        """Returns the temperatures at an array of steps, for a run of n_steps
+        steps.
+
+        Parameters
+        ----------
+        steps : np.ndarray
+            Steps (integers; -1 may be included, for the temperature tolerance
+            of anneal).
+
+        n_steps : int
+            Length of the run.
+        """
+        pass
+
+    def __call__(self, step, n_steps):
+        """Returns the temperature at a single step."""
+        return float(self.temperatures(np.asarray(step), n_steps))
+
+    def length(self, n_steps):
+        """Returns the number of steps after which the schedule ends, for a run
+        of n_steps steps. By default, this is n_steps."""
+        return n_steps
+
+    def table(self, n_steps, tol=None):
+        """Returns the temperatures of a run of n_steps steps, as a sequence
+        indexed by step, which computes them chunk_size steps at a time.
+
+        If tol is given, the stop attribute of the table is the first step at
+        which the temperature differs by less than tol from the one at the
+        step before (the temperature break of anneal), as soon as the table
+        has been indexed at or after that step, and math.inf until then.
+        """
+        return _ChunkedTable(self, n_steps, tol)
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__,
+                               ", ".join("{}={!r}".format(k, v)
+                                         for k, v in vars(self).items()))
+
+
+class Linear(Schedule):
+    """Cools linearly from t0 to t_end over the run. (Linear() is the default
+    schedule of BaseAnnealer, 1 - step/n_steps.)"""
+
+    def __init__(self, t0=1, t_end=0):
+        self.t0 = t0
+        self.t_end = t_end
+
+    def temperatures(self, steps, n_steps):
+        return self.t0 - (self.t0 - self.t_end) * (steps / n_steps)
+
+
+class Exponential(Schedule):
+    """Cools exponentially from t0 to t_end (both positive) over the run:
+    t0 * (t_end/t0)**(step/n_steps)."""
+
+    def __init__(self, t0, t_end):
+        if not (t0 > 0 and t_end > 0):
+            raise ValueError("Temperatures must be positive.")
+
+        self.t0 = t0
+        self.t_end = t_end
+
+    def temperatures(self, steps, n_steps):
+        return self.t0 * (self.t_end / self.t0) ** (steps / n_steps)
+
+
+class _Cooling(Schedule):
+    """Schedule with no fixed end temperature, which ends once the
+    temperature is below t_min (if given)."""
+
+    def length(self, n_steps):
+        if self.t_min is None:
+            return n_steps
+        else:
+            return min(n_steps, max(self._steps_to(self.t_min), 0))
+
+    @abc.abstractmethod
+    def _steps_to(self, temp):  # pragma: no cover
+        """Returns the first step at which the temperature is below temp."""
+        pass
+
+
+class Geometric(_Cooling):
+    """Multiplies the temperature by alpha every step: t0 * alpha**step."""
+
+    def __init__(self, t0, alpha, t_min=None):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be in (0, 1).")
+
+        self.t0 = t0
+        self.alpha = alpha
+        self.t_min = t_min
+
+    def temperatures(self, steps, n_steps):
+        return self.t0 * self.alpha ** steps.astype(float)
+
+    def _steps_to(self, temp):
+        return math.floor(math.log(temp / self.t0) / math.log(self.alpha)) + 1
+
+
+class Logarithmic(_Cooling):
+    """The slow schedule of Geman and Geman, c / log(step + e), which starts
+    at c."""
+
+    def __init__(self, c, t_min=None):
+        self.c = c
+        self.t_min = t_min
+
+    def temperatures(self, steps, n_steps):
+        return self.c / np.log(steps + math.e)
+
+    def _steps_to(self, temp):
+        # only feasible for fairly high t_min
+        step = math.exp(min(self.c / temp, 700)) - math.e
+        return math.floor(min(step, 2**62)) + 1
+
+
+class LundyMees(_Cooling):
+    """The schedule of Lundy and Mees, where T -> T / (1 + beta*T) every step,
+    i.e. t0 / (1 + beta*t0*step)."""
+
+    def __init__(self, t0, beta, t_min=None):
+        self.t0 = t0
+        self.beta = beta
+        self.t_min = t_min
+
+    def temperatures(self, steps, n_steps):
+        return self.t0 / (1 + self.beta * self.t0 * steps)
+
+    def _steps_to(self, temp):
+        return math.floor((self.t0 / temp - 1) / (self.beta * self.t0)) + 1
+
+
+class Piecewise(Schedule):
+    """Interpolates linearly between temperatures given at fractions of the
+    run, e.g. Piecewise([0, 0.5, 1], [10, 1, 0]). (The temperature is
+    constant before the first fraction and after the last.)"""
+
+    def __init__(self, fractions, temperatures):
+        if len(fractions) != len(temperatures) or not fractions:
+            raise ValueError("fractions and temperatures must have the same, "
+                             "nonzero length.")
+
+        if any(a > b for a, b in zip(fractions, fractions[1:])):
+            raise ValueError("fractions must be increasing.")
+
+        self.fractions = list(fractions)
+        self.temps = list(temperatures)
+
+    def temperatures(self, steps, n_steps):
+        return np.interp(steps / n_steps, self.fractions, self.temps)
+
+
+class FunctionSchedule(Schedule):
+    """Wraps a function of the step, e.g. the temperature method of an
+    annealer. Since the function only takes one step at a time, its table is
+    never precomputed."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def temperatures(self, steps, n_steps):
+        return np.array([self.function(step) for step in steps.flat],
+                        dtype=float).reshape(steps.shape)
+
+    def __call__(self, step, n_steps):
+        return self.function(step)
+
+    def table(self, n_steps, tol=None):
+        return _LazyTable(self, n_steps, tol)
+
+
+class AdaptiveSchedule(Schedule):
+    """A schedule whose temperature is adjusted during the run, according to
+    how the run is going, rather than fixed beforehand.
+
+    anneal() calls start before the first step, and update after every step.
+    When a run is resumed from a checkpoint, the schedule is restored as it
+    was then, and resume is called instead of start. Either way, finish is
+    called once the run ends (even if it raises). The table of an adaptive
+    schedule always gives its current temperature.
+    """
+
+    temp = None
+
+    @abc.abstractmethod
+    def start(self, annealer, n_steps):  # pragma: no cover
+        """Prepares the schedule for a run of n_steps steps of annealer."""
+        pass
+
+    @abc.abstractmethod
+    def update(self, annealer, step, accepted):  # pragma: no cover
+        """Adjusts the temperature after a step of annealer, given whether it
+        was accepted."""
+        pass
+
+    def resume(self, annealer):
+        """Prepares the schedule to carry on with a run of annealer resumed
+        from a checkpoint, e.g. by restoring the attributes of annealer it
+        adjusts (which aren't in the checkpoint). Does nothing by default."""
+        pass
+
+    def finish(self, annealer):
+        """Cleans up after a run of annealer, e.g. by putting back the
+        attributes of annealer it adjusted. Does nothing by default."""
+        pass
+
+    def temperatures(self, steps, n_steps):
+        return np.full(np.shape(steps), self.temp, dtype=float)
+
+    def table(self, n_steps, tol=None):
+        # (the temperatures of an adaptive schedule have no break)
+        return _AdaptiveTable(self)
+
+
+class ModifiedLam(AdaptiveSchedule):
+    """The modified Lam schedule (of Swartz and Boyan), which steers the
+    acceptance rate along a target curve: it starts out near 1, drops to 0.44
+    over the first 15% of the run, stays there until 65% of the run, and then
+    drops exponentially towards 0.
+
+    Every step, the temperature is divided by factor if the acceptance rate
+    over the last window steps is below the target, and multiplied by it
+    otherwise. With adapt_scale, the move_scale of the annealer (e.g. the
+    scale of the moves of an RvfSolver) is adjusted in the same way, starting
+    from its own value and staying between min_scale and max_scale; the
+    annealer gets its original move_scale back once the run is over. (The
+    current scale is kept as scale, so that it is saved along with the
+    schedule in checkpoints.)
+
+    The acceptance rate and the mean and variance of the energy over the last
+    window steps are kept in ring buffers (see acceptance_rate and
+    energy_std).
+    """
+
+    def __init__(self, t0=1, window=500, factor=0.999, adapt_scale=False,
+                 min_scale=1e-6, max_scale=1):
+        if not 0 < factor < 1:
+            raise ValueError("factor must be in (0, 1).")
+
+        self.t0 = t0
+        self.window = window
+        self.factor = factor
+        self.adapt_scale = adapt_scale
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+
+        self.temp = t0
+        self.scale = max_scale
+        self._original_scale = None
+        self._acceptance = helpers.RingBuffer(window)
+        self._energies = helpers.RingBuffer(window)
+        self._n_steps = None
+
+    def __repr__(self):
+        return ("ModifiedLam(t0={!r}, window={!r}, factor={!r}, "
+                "adapt_scale={!r})".format(self.t0, self.window, self.factor,
+                                           self.adapt_scale))
+
+    @staticmethod
+    def target(fraction):
+        """Target acceptance rate after a given fraction of the run."""
+        if fraction < 0.15:
+            return 0.44 + 0.56 * 560 ** (-fraction / 0.15)
+        elif fraction < 0.65:
+            return 0.44
+        else:
+            return 0.44 * 440 ** (-(fraction - 0.65) / 0.35)
+
+    @property
+    def acceptance_rate(self):
+        """Acceptance rate over the last window steps."""
+        return self._acceptance.mean()
+
+    @property
+    def energy_std(self):
+        """Standard deviation of the energy over the last window steps."""
+        return math.sqrt(self._energies.variance())
+
+    def start(self, annealer, n_steps):
+        self.temp = self.t0
+        self._n_steps = n_steps
+        self._acceptance.clear()
+        self._energies.clear()
+
+        if self.adapt_scale:
+            self._original_scale = annealer.move_scale
+            self.scale = helpers.clip(annealer.move_scale, self.min_scale,
+                                      self.max_scale)
+            annealer.move_scale = self.scale
+
+    def resume(self, annealer):
+        if self.adapt_scale:
+            self._original_scale = annealer.move_scale
+            annealer.move_scale = self.scale
+
+    def finish(self, annealer):
+        if self.adapt_scale:
+            annealer.move_scale = self._original_scale
+
+    def update(self, annealer, step, accepted):
+        self._acceptance.append(accepted)
+        self._energies.append(annealer.energy)
+
+        if self._acceptance.mean() > self.target(step / self._n_steps):
+            change = self.factor
+        else:
+            change = 1 / self.factor
+
+        self.temp *= change
+
+        if self.adapt_scale:
+            self.scale = helpers.clip(self.scale * change, self.min_scale,
+                                      self.max_scale)
+            annealer.move_scale = self.scale
+
+
+class TimeBased:
+    """Follows a schedule according to the fraction of time_limit (in
+    seconds) that has elapsed rather than to the step, ending once the time
+    is up; anneal(schedule=TimeBased(schedule, time_limit)) is the same as
+    anneal(schedule=schedule, time_limit=time_limit, time_schedule=True).
+    """
+
+    def __init__(self, schedule, time_limit):
+        self.schedule = schedule
+        self.time_limit = time_limit
+
+    def __repr__(self):
+        return "TimeBased({!r}, {!r})".format(self.schedule, self.time_limit)
+
+
+def acceptance_temperature(deltas, rate):
+    """Returns the temperature at which uphill moves, with the changes in
+    energy given by the positive values of deltas, are accepted at a given
+    average rate (in (0, 1)) by the Metropolis criterion.
+
+    (Downhill moves are always accepted, so they're left out.)
+    """
+    deltas = np.asarray(deltas, dtype=float)
+    uphill = deltas[deltas > 0]
+
+    if not 0 < rate < 1:
+        raise ValueError("rate must be in (0, 1).")
+
+    if not len(uphill):
+        raise ValueError("No uphill moves were given.")
+
+    def acceptance(temp):
+        return np.exp(-uphill / temp).mean()
+
+    # at these temperatures, every move is accepted with a probability of at
+    # most (resp. at least) rate, so the temperature is found in between by
+    # bisecting in log space
+    low = uphill.min() / -math.log(rate)
+    high = uphill.max() / -math.log(rate)
+
+    for _ in range(100):
+        if high / low - 1 < 1e-12:
+            break
+
+        middle = math.sqrt(low * high)
+
+        if acceptance(middle) < rate:
+            low = middle
+        else:
+            high = middle
+
+    return math.sqrt(low * high)
+
+
+class _AdaptiveTable:
+    """Table of an adaptive schedule, giving its current temperature at any
+    step."""
+
+    stop = math.inf
+
+    def __init__(self, schedule):
+        self._schedule = schedule
+
+    def __getitem__(self, step):
+        return self._schedule.temp
+
+
+class _ChunkedTable:
+    """Table of the temperatures of a schedule (see Schedule.table), which
+    keeps the chunk of them around the last step indexed as an array."""
+
+    def __init__(self, schedule, n_steps, tol=None):
+        self._schedule = schedule
+        self._n_steps = n_steps
+        self._tol = tol
+
+        # the temperatures of steps start to end
+        self._chunk = np.empty(0)
+        self._start = self._end = 0
+
+        # temperature breaks have been looked for before this step
+        self._searched = 0
+        self.stop = math.inf
+
+    def __len__(self):
+        return self._n_steps
+
+    def __getitem__(self, step):
+        if self._start <= step < self._end:
+            return self._chunk.item(step - self._start)
+        else:
+            return self._load(step)
+
+    def _load(self, step):
+        """Computes the chunk of temperatures step is in, and returns the one
+        at step."""
+        if not 0 <= step < self._n_steps:
+            raise IndexError("step out of range")
+
+        size = self._schedule.chunk_size
+        self._start = step - step % size
+        self._end = min(self._start + size, self._n_steps)
+        self._chunk = self._temperatures(self._start, self._end)
+
+        # (breaks are looked for in every chunk up to this one, in case steps
+        # were skipped, e.g. by time_schedule)
+        while self._tol is not None and self._searched < self._end:
+            start = self._searched
+            end = min(start + size, self._n_steps)
+            changes = np.abs(np.diff(self._temperatures(start - 1, end)))
+            breaks = np.flatnonzero(changes < self._tol)
+
+            if len(breaks):
+                self.stop = start + int(breaks[0])
+                self._tol = None
+
+            self._searched = end
+
+        return self._chunk.item(step - self._start)
+
+    def _temperatures(self, start, end):
+        return self._schedule.temperatures(np.arange(start, end),
+                                           self._n_steps)
+
+
+class _LazyTable:
+    """Table of the temperatures of a schedule, computed when indexed. If tol
+    is given, each step indexed is checked for a temperature break (see
+    Schedule.table)."""
+
+    def __init__(self, schedule, n_steps, tol=None):
+        self._schedule = schedule
+        self._n_steps = n_steps
+        self._tol = tol
+        self.stop = math.inf
+
+    def __len__(self):
+        return self._n_steps
+
+    def __getitem__(self, step):
+        temp = self._schedule(step, self._n_steps)
+
+        if (self._tol is not None and step < self.stop and
+                abs(self._schedule(step - 1, self._n_steps) - temp) <
+                self._tol):
+            self.stop = step
+
+        return temp
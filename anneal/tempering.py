@@ -0,0 +1,243 @@
+import copy
+import math
+import multiprocessing
+import numpy as np
+import random
+from anneal import helpers
+
+
+class ParallelTemperingAnnealer:
+    """Parallel tempering (replica exchange) on top of a BaseAnnealer.
+
+    Runs one replica of a given annealer at each temperature of a fixed
+    ladder. Every swap_interval steps, replicas at neighboring temperatures
+    may swap temperatures, according to the Metropolis criterion. (Only the
+    temperatures and energies are exchanged; each replica keeps its state.)
+
+    The replicas use the neighbor and energy_method (or move protocol) of the
+    given annealer as they are, so any BaseAnnealer subclass can be used.
+    """
+
+    def __init__(self, annealer, temperatures, swap_interval=10,
+                 processes=True, seed=None):
+        """
+        Parameters
+        ----------
+        annealer : BaseAnnealer
+            The annealer to copy for each replica. Its max_steps is used as
+            the number of steps each replica takes, unless another value is
+            passed to anneal().
+
+        temperatures : list of float
+            The temperature ladder; one replica is created per temperature.
+            Must all be positive.
+
+        swap_interval : int, optional
+            Default is 10.
+
+            Number of steps the replicas take between swap attempts.
+
+        processes : bool, optional
+            Default is True.
+
+            If True, each replica runs in its own process. Otherwise, the
+            replicas take turns in the current process.
+
+        seed : int, optional
+            Default is None.
+
+            Seed for the swap decisions and for the random number generators
+            of each replica.
+        """
+        temperatures = sorted(temperatures)
+
+        if len(temperatures) < 2:
+            raise ValueError("At least two temperatures are needed.")
+
+        if temperatures[0] <= 0:
+            raise ValueError("Temperatures must be positive.")
+
+        if not (isinstance(swap_interval, int) and swap_interval > 0):
+            raise ValueError("swap_interval must be a positive integer.")
+
+        self.annealer = annealer
+        self.temperatures = temperatures
+        self.swap_interval = swap_interval
+        self.processes = processes
+        self.seed = seed
+
+        self.best_state = None
+        self.best_energy = None
+        self.swap_rates = None
+
+    def __str__(self):
+        return "{}({} replicas of {})".format(type(self).__name__,
+                                               len(self.temperatures),
+                                               type(self.annealer).__name__)
+
+    def _start_replicas(self, rng):
+        """Creates a replica for each temperature."""
+        seeds = helpers.spawn_seeds(rng.randrange(2**32),
+                                    len(self.temperatures))
+
+        if self.processes:
+            return [_ProcessReplica(self.annealer, seed) for seed in seeds]
+        else:
+            return [_LocalReplica(self.annealer, seed) for seed in seeds]
+
+    def _swap(self, ladder, energies, parity, rng, n_accepted):
+        """Attempts to swap the replicas at temperatures (k, k + 1), for every
+        k with the given parity. ladder[k] is the index of the replica
+        currently at temperature k."""
+        for k in range(parity, len(ladder) - 1, 2):
+            i, j = ladder[k], ladder[k + 1]
+
+            log_p = ((1/self.temperatures[k] - 1/self.temperatures[k + 1]) *
+                     (energies[i] - energies[j]))
+
+            if log_p >= 0 or rng.random() < math.exp(log_p):
+                ladder[k], ladder[k + 1] = j, i
+                n_accepted[k] += 1
+
+    def anneal(self, max_steps=None):
+        """Runs the replicas for max_steps steps each, swapping temperatures
+        every swap_interval steps (if max_steps isn't a multiple of
+        swap_interval, the last steps are taken without a swap after them).
+
+        Parameters
+        ----------
+        max_steps : int, optional
+            Default is the max_steps of the annealer.
+
+        Returns
+        -------
+        (<>, float)
+            The best state and energy found by any replica, passed through the
+            format_output method of the annealer.
+        """
+        if max_steps is None:
+            max_steps = self.annealer.max_steps
+
+        rng = random.Random(self.seed)
+        n_temps = len(self.temperatures)
+
+        # every round but the last is swap_interval steps long, and no swaps
+        # are attempted after a shorter last round
+        n_rounds = -(-max_steps // self.swap_interval)
+
+        ladder = list(range(n_temps))
+        energies = [None] * n_temps
+        n_accepted = [0] * (n_temps - 1)
+        n_attempts = [0] * (n_temps - 1)
+
+        replicas = self._start_replicas(rng)
+
+        try:
+            for round_ in range(n_rounds):
+                n_steps = min(self.swap_interval,
+                              max_steps - round_ * self.swap_interval)
+
+                for k, i in enumerate(ladder):
+                    replicas[i].start_sweep(self.temperatures[k], n_steps)
+
+                for i, replica in enumerate(replicas):
+                    energies[i] = replica.finish_sweep()
+
+                if n_steps < self.swap_interval:
+                    break
+
+                parity = round_ % 2
+
+                for k in range(parity, n_temps - 1, 2):
+                    n_attempts[k] += 1
+
+                self._swap(ladder, energies, parity, rng, n_accepted)
+
+            results = [replica.best() for replica in replicas]
+
+        finally:
+            for replica in replicas:
+                replica.close()
+
+        self.best_state, self.best_energy = min(results, key=lambda r: r[1])
+        self.swap_rates = [a / n if n else 0
+                           for a, n in zip(n_accepted, n_attempts)]
+
+        return self.annealer.format_output((self.best_state,
+                                            self.best_energy))
+
+
+class _LocalReplica:
+    """Replica living in the current process."""
+
+    def __init__(self, annealer, seed):
+        self.annealer = copy.deepcopy(annealer)
+        self.annealer.reseed(seed)
+        self.annealer._reset()
+        self._energy = None
+
+    def start_sweep(self, temp, n_steps):
+        self._energy = self.annealer._sweep(temp, n_steps)
+
+    def finish_sweep(self):
+        return self._energy
+
+    def best(self):
+        return self.annealer.best_state, self.annealer.best_energy
+
+    def close(self):
+        pass
+
+
+class _ProcessReplica:
+    """Replica living in its own process; it's sent temperatures and sends
+    back energies."""
+
+    def __init__(self, annealer, seed):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_replica_worker,
+                                                args=(child_conn, annealer,
+                                                      seed),
+                                                daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def start_sweep(self, temp, n_steps):
+        self._conn.send(("sweep", (temp, n_steps)))
+
+    def finish_sweep(self):
+        return self._conn.recv()
+
+    def best(self):
+        self._conn.send(("best", ()))
+        return self._conn.recv()
+
+    def close(self):
+        try:
+            self._conn.send(("close", ()))
+        except (BrokenPipeError, OSError):  # pragma: no cover
+            pass
+
+        self._conn.close()
+        self._process.join()
+
+
+def _replica_worker(conn, annealer, seed):  # pragma: no cover
+    """Main loop of a replica process."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    annealer.reseed(seed)
+    annealer._reset()
+
+    while True:
+        command, args = conn.recv()
+
+        if command == "sweep":
+            conn.send(annealer._sweep(*args))
+        elif command == "best":
+            conn.send((annealer.best_state, annealer.best_energy))
+        elif command == "close":
+            break
+
+    conn.close()
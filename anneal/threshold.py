@@ -0,0 +1,113 @@
+import abc
+from anneal import anneal, schedules
+
+
+class ThresholdAcceptingAnnealer(anneal.BaseAnnealer):
+    """Threshold accepting (Dueck and Scheuer): a move is accepted if it
+    increases the energy by less than a threshold, and rejected otherwise.
+
+    The thresholds are given by the schedule (or temperature), exactly like
+    temperatures are, and the rest of the algorithm is that of BaseAnnealer.
+    No random numbers or exponentials are needed to decide on a move.
+
+    Like the other annealers of this module, this can be combined with an
+    existing subclass of BaseAnnealer by inheriting from both, e.g.
+
+        class ThresholdTSP(ThresholdAcceptingAnnealer, TravelingSalesPerson):
+            pass
+    """
+
+    def _accept_state(self, delta, temp):
+        """Returns True if delta is below the threshold temp."""
+        return delta < temp
+
+    @staticmethod
+    def _move_weights(deltas, temp):
+        # in rejection-free mode, every move under the threshold is as likely
+        # to be made
+        return (deltas < temp).astype(float)
+
+
+class _LevelAnnealer(anneal.BaseAnnealer):
+    """Annealer accepting a move if the energy it leads to is at most a level
+    (which depends on the run so far, so rejection-free mode isn't
+    supported)."""
+
+    def _reset(self, *args, **kwargs):
+        if kwargs.get("rejection_free"):
+            raise ValueError("{} doesn't support rejection_free."
+                             .format(type(self).__name__))
+
+        super()._reset(*args, **kwargs)
+
+    @abc.abstractmethod
+    def _level(self, temp):  # pragma: no cover
+        """Returns the highest energy that can be moved to, given the value
+        temp of the schedule."""
+        pass
+
+    def _accept_state(self, delta, temp):
+        """Returns True if the energy after the move is at most the level."""
+        return self._energy + delta <= self._level(temp)
+
+
+class GreatDelugeAnnealer(_LevelAnnealer):
+    """The great deluge algorithm (Dueck): a move is accepted if the energy it
+    leads to is at most the current "water level", which falls during the
+    run.
+
+    The water level is given by the schedule (or temperature), in place of
+    the temperature. If neither is given, the level falls linearly from the
+    energy of the initial state to target_energy, or to 0 if there isn't one
+    (which suits positive energies, such as the length of a tour). Without a
+    target_energy, anneal() therefore requires the initial energy to be
+    positive, so that the level does fall.
+    """
+
+    def _reset(self, *args, **kwargs):
+        self.__target_energy = kwargs.get("target_energy",
+                                          self.defaults["target_energy"])
+        super()._reset(*args, **kwargs)
+
+    def _default_levels(self, schedule):
+        """True if the default water levels are used for a given schedule
+        option."""
+        return (schedule is None and "temperature" not in vars(self) and
+                not self._overrides("temperature"))
+
+    def anneal(self, *args, **kwargs):
+        if (kwargs.get("resume_from") is None and
+                kwargs.get("target_energy") is None and
+                self._default_levels(kwargs.get("schedule")) and
+                self.energy_method(self.initial_state) <= 0):
+            raise ValueError("Without a schedule, GreatDelugeAnnealer needs "
+                             "a target_energy unless the initial energy is "
+                             "positive.")
+
+        return super().anneal(*args, **kwargs)
+
+    def _make_schedule(self, schedule):
+        """Returns the schedule of water levels (see the class docstring)."""
+        if self._default_levels(schedule):
+            target = self.__target_energy
+            return schedules.Linear(self._energy,
+                                    0 if target is None else target)
+        else:
+            return super()._make_schedule(schedule)
+
+    def _level(self, temp):
+        return temp
+
+
+class RecordToRecordAnnealer(_LevelAnnealer):
+    """Record-to-record travel (Dueck): a move is accepted if the energy it
+    leads to is at most the best energy found so far (the record) plus a
+    deviation.
+
+    The deviation is given by the schedule (or temperature), in place of the
+    temperature, so it can be kept fixed, e.g. with
+    schedules.Linear(deviation, deviation), or shrunk during the run.
+    """
+
+    def _level(self, temp):
+        return self._best_energy + temp
@@ -0,0 +1,319 @@
+import numpy as np
+import os
+import pickle
+import struct
+from collections import namedtuple
+
+
+Record = namedtuple("Record", ["step", "energy", "temperature", "state"])
+Record.__doc__ = """One point of a trajectory recorded by anneal().
+
+step is the number of steps taken when the state was recorded, and energy and
+temperature are the energy of the state and the temperature it was reached
+at. (The temperature of the first record, which holds the initial state, is
+None.)
+"""
+
+
+# columns stored next to the states by ArrayRecorder; a temperature of None is
+# stored as NaN
+COLUMNS = np.dtype([("step", np.int64),
+                    ("energy", np.float64),
+                    ("temperature", np.float64)])
+
+
+def as_record(obj):
+    """Returns obj if it's a Record; otherwise, obj is taken to be a bare state
+    (as written by BaseAnnealer.pickle_state) and wrapped in a Record."""
+    if isinstance(obj, Record):
+        return obj
+    else:
+        return Record(None, None, None, obj)
+
+
+class PickleRecorder:
+    """Records a trajectory to a pickle file, one pickle per Record.
+
+    The file is kept open until close() is called, and records are pickled as
+    soon as they're given (so states that are later modified in place are
+    recorded as they were), but they are only written to the file in chunks
+    of buffer_size records.
+    """
+
+    def __init__(self, filename, append=False, buffer_size=1000,
+                 resume_at=None):
+        """
+        Parameters
+        ----------
+        filename : str
+            File to write to.
+
+        append : bool, optional
+            Default is False.
+
+            If True, opens filename in append mode.
+
+        buffer_size : int, optional
+            Default is 1000.
+
+            Number of records to keep in memory before writing them out.
+
+        resume_at : int, optional
+            Default is None.
+
+            A position returned by position(). If given, the trajectory
+            already in filename is kept up to that position, and anything
+            written after it is discarded.
+        """
+        self.filename = filename
+        self.buffer_size = buffer_size
+
+        if resume_at is not None:
+            self._file = open(filename, 'r+b')
+            self._file.truncate(resume_at)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(filename, 'ab' if append else 'wb')
+
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def record(self, step, energy, temperature, state):
+        """Adds a record to the trajectory."""
+        self._buffer.append(pickle.dumps(Record(step, energy, temperature,
+                                                state),
+                                         pickle.HIGHEST_PROTOCOL))
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records to the file."""
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._file.flush()
+            self._buffer.clear()
+
+    def position(self):
+        """Flushes the buffered records and returns the current position in
+        the trajectory, which can be given back as resume_at."""
+        self.flush()
+        return self._file.tell()
+
+    def close(self):
+        """Writes any buffered records and closes the file."""
+        if not self.closed:
+            self.flush()
+            self._file.close()
+
+
+class ArrayRecorder:
+    """Records a trajectory of fixed-shape NumPy array states to a directory of
+    .npy files, which can be memory-mapped by load_states and load_records.
+
+    states.npy holds the states, stacked along the first axis, and
+    records.npy the step, energy and temperature of each state (see COLUMNS).
+    Records are copied into preallocated buffers of buffer_size records,
+    which are appended to the files when full; the headers of the files are
+    then updated, so they stay readable during the run.
+    """
+
+    def __init__(self, path, buffer_size=1000, resume_at=None):
+        """
+        Parameters
+        ----------
+        path : str
+            Directory to write to. It's created if it doesn't exist; any
+            trajectory already in it is overwritten.
+
+        buffer_size : int, optional
+            Default is 1000.
+
+            Number of records to keep in memory before writing them out.
+
+        resume_at : int, optional
+            Default is None.
+
+            A position returned by position(). If given, the trajectory
+            already in path is kept up to that position, and anything written
+            after it is discarded.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+
+        os.makedirs(path, exist_ok=True)
+
+        self._records = np.empty(buffer_size, dtype=COLUMNS)
+        self._records_file = _NpyAppender(os.path.join(path, "records.npy"),
+                                          COLUMNS, (), n_rows=resume_at)
+
+        # allocated on the first record, once the shape of the states is known
+        self._states = None
+        self._states_file = None
+
+        if resume_at:
+            # (only the header is read, since the file is truncated next,
+            # which can't be done while it's memory-mapped)
+            shape, dtype = _npy_header(os.path.join(path, "states.npy"))
+            self._allocate_states(shape[1:], dtype, resume_at)
+
+        self._n_buffered = 0
+
+    def _allocate_states(self, shape, dtype, n_rows=None):
+        self._states = np.empty((self.buffer_size,) + shape, dtype=dtype)
+        self._states_file = _NpyAppender(os.path.join(self.path, "states.npy"),
+                                         dtype, shape, n_rows=n_rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._records_file.closed
+
+    def record(self, step, energy, temperature, state):
+        """Adds a record to the trajectory. state must have the same shape as
+        the first state recorded, and is cast to its dtype."""
+        if self._states is None:
+            state = np.asarray(state)
+            self._allocate_states(state.shape, state.dtype)
+
+        i = self._n_buffered
+
+        self._states[i] = state
+        self._records[i] = (step, energy,
+                            np.nan if temperature is None else temperature)
+        self._n_buffered += 1
+
+        if self._n_buffered == self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records to the files."""
+        n = self._n_buffered
+
+        if n:
+            self._states_file.append(self._states[:n])
+            self._records_file.append(self._records[:n])
+            self._n_buffered = 0
+
+    def position(self):
+        """Flushes the buffered records and returns the number of records
+        written, which can be given back as resume_at."""
+        self.flush()
+        return self._records_file.n_rows
+
+    def close(self):
+        """Writes any buffered records and closes the files."""
+        if not self.closed:
+            self.flush()
+            self._records_file.close()
+
+            if self._states_file is not None:
+                self._states_file.close()
+
+
+def load_states(path, mmap_mode="r"):
+    """Returns the states written by an ArrayRecorder to path, as a
+    numpy.memmap (unless mmap_mode is None) of shape (n_records, *shape)."""
+    return np.load(os.path.join(path, "states.npy"), mmap_mode=mmap_mode)
+
+
+def load_records(path, mmap_mode="r"):
+    """Returns the records written by an ArrayRecorder to path (without the
+    states), as a structured numpy.memmap (unless mmap_mode is None) with the
+    fields of COLUMNS."""
+    return np.load(os.path.join(path, "records.npy"), mmap_mode=mmap_mode)
+
+
+def _npy_header(filename):
+    """Returns the shape and dtype of the array in a .npy file, read from its
+    header alone."""
+    with open(filename, "rb") as file:
+        version = np.lib.format.read_magic(file)
+
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+
+    return shape, dtype
+
+
+class _NpyAppender:
+    """A .npy file that arrays are appended to along the first axis.
+
+    The header is given a fixed length, large enough for any number of rows,
+    so that it can be rewritten in place as the file grows. If n_rows is
+    given, the file (previously written by an _NpyAppender) is reopened and
+    truncated to its first n_rows rows.
+    """
+
+    _MAGIC = b"\x93NUMPY\x01\x00"
+
+    def __init__(self, filename, dtype, shape, n_rows=None):
+        self._dtype = np.dtype(dtype)
+        self._shape = tuple(shape)
+
+        self._header_length = None
+        self._header_length = len(self._header(np.iinfo(np.int64).max))
+
+        if n_rows is None:
+            self.n_rows = 0
+            self._file = open(filename, "wb")
+        else:
+            row_size = self._dtype.itemsize * int(np.prod(self._shape))
+
+            self.n_rows = n_rows
+            self._file = open(filename, "r+b")
+            self._file.truncate(self._header_length + n_rows * row_size)
+
+        self._write_header()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def _header(self, n_rows):
+        header = repr({"descr": np.lib.format.dtype_to_descr(self._dtype),
+                       "fortran_order": False,
+                       "shape": (n_rows,) + self._shape})
+
+        if self._header_length is not None:
+            length = self._header_length
+        else:
+            # the header is padded to a multiple of 64 bytes, like those
+            # written by numpy
+            length = -(-(len(self._MAGIC) + 2 + len(header) + 1) // 64) * 64
+
+        header = header.ljust(length - len(self._MAGIC) - 2 - 1) + "\n"
+
+        return (self._MAGIC + struct.pack("<H", len(header)) +
+                header.encode("latin1"))
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(self._header(self.n_rows))
+        self._file.seek(0, os.SEEK_END)
+
+    def append(self, rows):
+        self._file.write(np.ascontiguousarray(rows, dtype=self._dtype)
+                         .tobytes())
+        self.n_rows += len(rows)
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -1,6 +1,5 @@
-from anneal import anneal
+from anneal import anneal, schedules
 import numpy as np
-import random
 from inspect import signature
 
 
@@ -37,17 +36,27 @@ class RvfSolver(anneal.BaseAnnealer):
         self.function = function
         self.n_parameters = n_parameters
 
+        # whether function accepts arrays; found out by batch_energy
+        self._vectorized = None
+
+        # scale of the moves made by neighbor; adjusted by adaptive schedules
+        # such as schedules.ModifiedLam(adapt_scale=True)
+        self.move_scale = kwargs.get("move_scale", 1)
+
         super().__init__(initial_state, *args, **kwargs)
 
     def copy_method(self, state):
         return np.copy(state)
 
-    def neighbor(self, state, scale=1):
+    def neighbor(self, state, scale=None):
+        if scale is None:
+            scale = self.move_scale
+
         # "scale" of each dimension
         sizes = abs(self.bounds[:, 1] - self.bounds[:, 0])
 
         # pick direction: each component in [-1, 1)
-        dx = 2*np.random.random(self.n_parameters) - 1
+        dx = 2*self.rng.random(self.n_parameters) - 1
         dx = np.multiply(dx, scale*sizes)
 
         moved = state + dx
@@ -67,6 +76,156 @@ class RvfSolver(anneal.BaseAnnealer):
         else:
             raise ValueError('Objective should be either "min" or "max".')
 
+    def batch_energy(self, states, vectorized=None):
+        """Returns the energies of an (N, d) array of states.
+
+        If the function accepts arrays (e.g. it only uses NumPy operations),
+        this is done with a single call, with each of its arguments being a
+        column of states. Otherwise, the function is called once per state.
+
+        Parameters
+        ----------
+        states : np.ndarray
+            Array of shape (N, d), with one state per row.
+
+        vectorized : bool, optional
+            Default is None.
+
+            Whether the function accepts arrays. If None, this is found out by
+            trying it (the first time the method is called).
+        """
+        if vectorized is None:
+            vectorized = self._vectorized
+
+        values = None
+
+        if vectorized is not False:
+            try:
+                values = np.asarray(self.function(*states.T), dtype=float)
+            except (TypeError, ValueError):
+                values = None
+
+            if values is None or values.shape != (len(states),):
+                if vectorized:
+                    raise ValueError("The function doesn't return an array of "
+                                     "values when given arrays.")
+                values = None
+
+            self._vectorized = values is not None
+
+        if values is None:
+            values = np.array([self.function(*state) for state in states],
+                              dtype=float)
+
+        if self.objective == 'min':
+            return values
+        elif self.objective == 'max':
+            return -values
+        else:
+            raise ValueError('Objective should be either "min" or "max".')
+
+    def anneal_batch(self, n_chains, max_steps=None, vectorized=None,
+                     scale=1, schedule=None, temp_tol=-1):
+        """Anneals n_chains independent chains at once, starting from the
+        initial state.
+
+        The chains are kept as an (n_chains, d) array: every step, all of the
+        moves are drawn with a single call to rng, their energies are
+        found with batch_energy, and acceptance and clipping are done with
+        array operations. Every chain follows the same temperature schedule.
+
+        Parameters
+        ----------
+        n_chains : int
+            Number of chains.
+
+        max_steps : int, optional
+            For if you want to run with a different max_steps than originally
+            specified.
+
+        vectorized : bool, optional
+            Default is None.
+
+            Passed to batch_energy.
+
+        scale : float, optional
+            Default is 1.
+
+            Scale of the moves, as for neighbor.
+
+        schedule : schedules.Schedule, optional
+            Default is None.
+
+            Temperature schedule, as for anneal (by default, that given by
+            temperature). If it ends before max_steps, so does the program.
+            Adaptive and time-based schedules aren't supported, since the
+            chains are run in lockstep without the checks of anneal.
+
+        temp_tol : float, optional
+            Default is -1.
+
+            As for anneal: if the change in temperature becomes smaller than
+            this, the program will abort.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The best state and best value of each chain, i.e. arrays of shape
+            (n_chains, d) and (n_chains,).
+        """
+        if isinstance(schedule, (schedules.AdaptiveSchedule,
+                                 schedules.TimeBased)):
+            raise ValueError("anneal_batch doesn't support adaptive or "
+                             "time-based schedules.")
+
+        if max_steps is not None:
+            self.max_steps = max_steps
+
+        lower, upper = self.bounds[:, 0], self.bounds[:, 1]
+        sizes = scale*abs(upper - lower)
+
+        states = np.tile(np.asarray(self.initial_state, dtype=float),
+                         (n_chains, 1))
+        energies = self.batch_energy(states, vectorized)
+
+        best_states = states.copy()
+        best_energies = energies.copy()
+
+        # the run ends where anneal() would end it: at the end of the
+        # schedule, or after the step at which a temperature break occurs
+        schedule = self._make_schedule(schedule)
+        temps = schedule.table(self.max_steps,
+                               temp_tol if temp_tol > 0 else None)
+        n_steps = min(schedule.length(self.max_steps), self.max_steps)
+
+        for step in range(n_steps):
+            temp = temps[step]
+
+            moved = states + sizes*(2*self.rng.random(states.shape) - 1)
+            np.clip(moved, lower, upper, out=moved)
+
+            delta = self.batch_energy(moved, vectorized) - energies
+
+            # exp(-delta/0) is 0 (or nan, for delta == 0), so only downhill
+            # moves are accepted at zero temperature
+            with np.errstate(over='ignore', divide='ignore',
+                             invalid='ignore'):
+                accepted = ((delta < 0) |
+                            (self.rng.random(n_chains) <
+                             np.exp(-delta/temp)))
+
+            states[accepted] = moved[accepted]
+            energies[accepted] += delta[accepted]
+
+            improved = energies < best_energies
+            best_states[improved] = states[improved]
+            best_energies[improved] = energies[improved]
+
+            if step >= temps.stop:
+                break
+
+        return self.format_output((best_states, best_energies))
+
     def format_output(self, output):
         if self.objective == 'max':
             return output[0], -output[1]
@@ -1,12 +1,8 @@
 import rvf
-import random
 import numpy as np
 
 
 if __name__ == "__main__":
-    random.seed(0)
-    np.random.seed(0)
-
     # ignore divide by zero warning
     np.seterr(divide='ignore')
 
@@ -29,9 +25,12 @@ if __name__ == "__main__":
     bounds_2 = [[-2, 2], [-2, 2]]
     bounds_3 = [[-2, 2], [-2, 2], [-2, 2]]
 
-    solver_1 = rvf.RvfSolver(f_1, point_1, bounds_1, max_steps=5000)
-    solver_2 = rvf.RvfSolver(f_2, point_2, bounds_2, max_steps=5000)
-    solver_3 = rvf.RvfSolver(f_3, point_3, bounds_3, max_steps=5000)
+    solver_1 = rvf.RvfSolver(f_1, point_1, bounds_1, max_steps=5000,
+                             seed=0)
+    solver_2 = rvf.RvfSolver(f_2, point_2, bounds_2, max_steps=5000,
+                             seed=0)
+    solver_3 = rvf.RvfSolver(f_3, point_3, bounds_3, max_steps=5000,
+                             seed=0)
 
     # pick one
     solver = solver_1
@@ -1,7 +1,22 @@
-from anneal import anneal
+from anneal import anneal, helpers
 import collections
+import concurrent.futures
 import copy
-import random
+import itertools
+import numpy as np
+import os
+
+
+SolveResult = collections.namedtuple("SolveResult", ["index", "board",
+                                                     "energy", "solved",
+                                                     "attempts"])
+SolveResult.__doc__ = """Outcome of solving one of the puzzles given to
+SudokuSolver.solve_many.
+
+index is the position of the puzzle in the input, board and energy are the
+best board found and its energy, solved says whether that is the optimum, and
+attempts is the number of anneals it took (at most restarts + 1).
+"""
 
 
 class SudokuSolver(anneal.BaseAnnealer):
@@ -13,47 +28,135 @@ class SudokuSolver(anneal.BaseAnnealer):
     The number of errors is quantified by the energy/cost function, which
     is computed by counting the number of unique elements in each row, column,
     and 3x3 block.
+
+    Swaps are made through the move protocol: the number of times each value
+    appears in each row and column is tracked, so that the change in energy
+    of a swap only depends on the two rows and columns it touches. The
+    possible swaps can also be listed (see moves), so that anneal can be run
+    with rejection_free=True.
+
+    Any board of size N x N, where N = n^2, is supported (with n x n blocks);
+    e.g. 16 x 16 or 25 x 25 boards. States are flat NumPy arrays of the cells
+    in row-major order, using the smallest unsigned integer type that can hold
+    N (uint8 for N < 256), and cells are referred to by their flat indices.
     """
 
     def __init__(self, puzzle, *args, **kwargs):
-        if not all(all(e in range(10) for e in row) for row in puzzle):
-            raise ValueError('Cells in the board must be in [0,9] (where 0 \
-                  represents an empty cell).')
+        size = len(puzzle)
+        block_size = _isqrt(size)
+
+        if (size == 0 or block_size**2 != size or
+                not all(len(row) == size for row in puzzle)):
+            raise ValueError("The puzzle must be an N x N grid, where N is a "
+                             "square number.")
+
+        if not all(all(e in range(size + 1) for e in row) for row in puzzle):
+            raise ValueError("Cells in the board must be in [0, {}] (where 0 "
+                             "represents an empty cell).".format(size))
 
         # in case the original puzzle is needed in the future
         self.puzzle = copy.deepcopy(puzzle)
 
-        initial_state, unknown = SudokuSolver.fill_puzzle(puzzle)
+        self.size = size
+        self.block_size = block_size
+
+        # energy of a solved board
+        self.optimum = -2*size**2
+
+        # flat indices of the cells in each row, column and block
+        cells = np.arange(size**2).reshape(size, size)
+        self.rows = cells
+        self.cols = cells.T.copy()
+        self.blocks = SudokuSolver.block_table(size)
+
+        # the generator is needed to fill the board, so it's created here and
+        # passed on
+        self.reseed(kwargs.get("seed", None), kwargs.get("rng", None))
+        kwargs["rng"] = self.rng
+
+        board, unknown = SudokuSolver.fill_puzzle(copy.deepcopy(puzzle),
+                                                  self.rng, self.blocks)
+        initial_state = np.array(board, dtype=np.min_scalar_type(size))
+        initial_state = initial_state.ravel()
 
         # we keep a list of unknown cells; we only want to make swaps with
         # these, not the pre-filled cells
-        self.unknown = unknown
+        self.unknown = [i*size + j for i, j in unknown]
+
+        # for each block with at least two unknown cells (the only blocks
+        # where swaps can be made), the list of its unknown cells
+        self.swap_blocks = SudokuSolver.swap_candidates(self.unknown, size,
+                                                        self.blocks)
+
+        # every possible swap, and the indices of the swaps touching each row
+        # and column (see moves and affected_moves)
+        self.swaps = [pair for cells in self.swap_blocks
+                      for pair in itertools.combinations(cells, 2)]
+        self._swaps_by_line = self._index_swaps()
+
+        # value counts of the rows and columns of a state (see counts)
+        self._row_counts = None
+        self._col_counts = None
+        self._counts_of = None
 
         super().__init__(initial_state, *args, **kwargs)
 
     @staticmethod
     def pretty_print(board):  # pragma: no cover
-        """Prints the board in a readable format."""
-        result = '\n'.join(' '.join(map(str, row)) for row in board)
+        """Prints the board (a grid or a flat state) in a readable format."""
+        board = np.asarray(board)
+        size = _isqrt(board.size)
+        width = len(str(size))
+
+        result = '\n'.join(' '.join(str(e).rjust(width) for e in row)
+                           for row in board.reshape(size, size))
         print(result)
 
+    def grid(self, state=None):
+        """Returns a state (default is the current state) as a list of
+        rows."""
+        if state is None:
+            state = self.state
+
+        return np.reshape(state, (self.size, self.size)).tolist()
+
+    @staticmethod
+    def block_table(size):
+        """Returns the flat indices of the cells of each block of a size x size
+        board, as an array whose i-th row holds those of block i (in
+        row-major order)."""
+        block_size = _isqrt(size)
+        cells = np.arange(size**2).reshape(size, size)
+
+        return (cells.reshape(block_size, block_size, block_size, block_size)
+                .swapaxes(1, 2).reshape(size, size))
+
     @staticmethod
-    def fill_puzzle(board):
+    def fill_puzzle(board, rng=None, blocks=None):
         """Fills the unknown cells in the board and returns the filled board
         and the list of the indices of the unknown cells.
 
         Filling is done so that each block contains the correct set of numbers,
-        i.e., 1-9.
+        i.e., 1-N, shuffled with rng (a numpy.random.Generator; a new one by
+        default). blocks is the block_table of the board, if already known.
         """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        size = len(board)
+
+        if blocks is None:
+            blocks = SudokuSolver.block_table(size)
 
         unknown = []
 
-        for block_index in range(9):
-            block_indices = SudokuSolver.block_indices(block_index)
-            missing = [num for num in range(1, 10) if num not in
-                       [board[i][j] for i, j in block_indices]]
+        for block in blocks.tolist():
+            block_indices = [divmod(cell, size) for cell in block]
+            present = set(board[i][j] for i, j in block_indices)
+            missing = [num for num in range(1, size + 1)
+                       if num not in present]
 
-            random.shuffle(missing)
+            rng.shuffle(missing)
 
             for i, j in block_indices:
                 if board[i][j] == 0:
@@ -63,76 +166,345 @@ class SudokuSolver(anneal.BaseAnnealer):
         return board, unknown
 
     @staticmethod
-    def block_indices(block_index):
+    def block_indices(block_index, block_size=3):
         """Gets the indices of a given block."""
 
         # indicies of the upper leftmost cell of the block
-        start_row = 3*(block_index // 3)
-        start_col = 3*(block_index % 3)
+        start_row = block_size*(block_index // block_size)
+        start_col = block_size*(block_index % block_size)
 
         indices = []
 
-        for row in range(start_row, start_row + 3):
-            for col in range(start_col, start_col + 3):
+        for row in range(start_row, start_row + block_size):
+            for col in range(start_col, start_col + block_size):
                 indices.append((row, col))
 
         return indices
 
+    @staticmethod
+    def swap_candidates(unknown, size=9, blocks=None):
+        """Groups the given unknown cells (flat indices) of a size x size board
+        by block, keeping only the blocks with at least two of them. blocks
+        is the block_table of the board, if already known."""
+        if blocks is None:
+            blocks = SudokuSolver.block_table(size)
+
+        # the block of each cell
+        block_of = np.empty(size**2, dtype=np.intp)
+        block_of[blocks] = np.arange(size)[:, np.newaxis]
+        block_of = block_of.tolist()
+
+        candidates = collections.defaultdict(list)
+
+        for cell in unknown:
+            candidates[block_of[cell]].append(cell)
+
+        return [cells for _, cells in sorted(candidates.items())
+                if len(cells) >= 2]
+
     @staticmethod
     def block(block_index, board):
         """Returns a (flattened) block of a given board."""
         return [board[i][j] for i, j in
-                SudokuSolver.block_indices(block_index)]
+                SudokuSolver.block_indices(block_index, _isqrt(len(board)))]
 
     @staticmethod
     def blockify(board):
-        """Returns a list of the 3x3 blocks."""
-        return [SudokuSolver.block(b, board) for b in range(9)]
+        """Returns a list of the blocks."""
+        return [SudokuSolver.block(b, board) for b in range(len(board))]
 
-    def neighbor(self, state):
-        """Returns a randomly selected "neighboring" board.
+    def counts(self, state):
+        """Returns tables (row_counts, col_counts) such that row_counts[i][v]
+        is the number of times v appears in row i of state (likewise for
+        columns).
 
-        First, we pick a random 3x3 block. Then, we randomly pick two "unknown"
-        cells in the block. (If there are less than two, we pick a different
-        block.) Then, we swap the contents of these two cells and return the
-        resulting board.
+        These are cached for the last state they were computed for, and kept
+        up to date by apply when moves are made to that state in place.
         """
+        if state is not self._counts_of:
+            values = np.asarray(state, dtype=np.intp)
+            tables = []
 
-        potential_blocks = list(range(9))
+            for lines in [self.rows, self.cols]:
+                counts = np.zeros((self.size, self.size + 1), dtype=int)
+                np.add.at(counts, (np.arange(self.size)[:, np.newaxis],
+                                   values[lines]), 1)
+                tables.append(counts.tolist())
 
-        while len(potential_blocks) > 0:
-            block = random.choice(potential_blocks)
-            candidates = [c for c in self.unknown if c in
-                          SudokuSolver.block_indices(block)]
+            self._row_counts, self._col_counts = tables
+            self._counts_of = state
 
-            if len(candidates) < 2:
-                potential_blocks.remove(block)
-                continue
+        return self._row_counts, self._col_counts
 
-            else:
-                break
+    def propose(self, state):
+        """Returns a random move: a pair of "unknown" cells in the same block,
+        to be swapped.
 
-        else:
-            # len(candidates) < 2 in every block;
+        First, we pick a random block with at least two unknown cells (from
+        swap_blocks). Then, we randomly pick two of them. If no block has two
+        unknown cells, None is returned.
+        """
+        if not self.swap_blocks:
             # puzzle should be already solved
+            return None
+
+        cells = self.swap_blocks[self.randrange(len(self.swap_blocks))]
+
+        k = len(cells)
+        a = self.randrange(k)
+        b = self.randrange(k - 1)
+
+        # pick two different cells without rejection
+        if b >= a:
+            b += 1
+
+        return cells[a], cells[b]
+
+    def _index_swaps(self):
+        """Returns the arrays of the indices of the swaps with a cell in each
+        row (the first size arrays) and in each column (the last size)."""
+        lines = [[] for _ in range(2 * self.size)]
+
+        for k, pair in enumerate(self.swaps):
+            touched = set()
+
+            for cell in pair:
+                i, j = divmod(cell, self.size)
+                touched.update([i, self.size + j])
+
+            for line in touched:
+                lines[line].append(k)
+
+        return [np.array(line, dtype=np.intp) for line in lines]
+
+    def moves(self, state):
+        """Returns every possible swap of two unknown cells in the same
+        block (whatever the state)."""
+        return self.swaps
+
+    def affected_moves(self, state, move):
+        """Returns the indices of the swaps whose change in energy may have
+        been changed by a swap: those with a cell in one of the rows or
+        columns it touched."""
+        (i1, j1), (i2, j2) = (divmod(cell, self.size) for cell in move)
+        by_line = self._swaps_by_line
+
+        return np.unique(np.concatenate([by_line[i1], by_line[i2],
+                                         by_line[self.size + j1],
+                                         by_line[self.size + j2]]))
+
+    @staticmethod
+    def _line_delta(counts, old, new):
+        """Change in energy when a cell of a row/column with the given value
+        counts changes from old to new (old != new)."""
+        return (counts[old] == 1) - (counts[new] == 0)
+
+    def delta_energy(self, state, move):
+        """Returns the change in energy caused by swapping two cells.
+
+        Only the (at most) two rows and two columns containing the cells are
+        affected, and their value counts tell us whether a value appears or
+        disappears from them.
+        """
+        if move is None:
+            return 0
+
+        c1, c2 = move
+        v1, v2 = state.item(c1), state.item(c2)
+
+        if v1 == v2:
+            return 0
+
+        i1, j1 = divmod(c1, self.size)
+        i2, j2 = divmod(c2, self.size)
+
+        row_counts, col_counts = self.counts(state)
+        delta = 0
+
+        if i1 != i2:
+            delta += (self._line_delta(row_counts[i1], v1, v2) +
+                      self._line_delta(row_counts[i2], v2, v1))
+
+        if j1 != j2:
+            delta += (self._line_delta(col_counts[j1], v1, v2) +
+                      self._line_delta(col_counts[j2], v2, v1))
+
+        return delta
+
+    def apply(self, state, move):
+        """Swaps the contents of two cells of state (in place)."""
+        if move is None:
             return state
 
-        (i1, j1), (i2, j2) = random.sample(candidates, 2)
+        c1, c2 = move
+        v1, v2 = state.item(c1), state.item(c2)
 
-        neighbor = copy.deepcopy(state)
+        state[c1], state[c2] = v2, v1
 
-        neighbor[i1][j1], neighbor[i2][j2] = neighbor[i2][j2], neighbor[i1][j1]
+        if state is self._counts_of:
+            i1, j1 = divmod(c1, self.size)
+            i2, j2 = divmod(c2, self.size)
 
-        return neighbor
+            for counts, k1, k2 in [(self._row_counts, i1, i2),
+                                   (self._col_counts, j1, j2)]:
+                counts[k1][v1] -= 1
+                counts[k1][v2] += 1
+                counts[k2][v2] -= 1
+                counts[k2][v1] += 1
+
+        return state
+
+    def undo(self, state, move):
+        """Reverts a swap (which is its own inverse)."""
+        return self.apply(state, move)
+
+    def neighbor(self, state):
+        """Returns a randomly selected "neighboring" board, where two unknown
+        cells in the same block have been swapped (see propose)."""
+        return self.apply(np.copy(state), self.propose(state))
+
+    def copy_method(self, state):
+        return np.copy(state)
 
     def energy_method(self, state):
         """Adds -1 to the energy/score for every unique value in each
         row/column.
 
-        "Best" score is 9*(-9) + 9*(-9) = -162
+        "Best" score is 9*(-9) + 9*(-9) = -162 (for an N x N board, -2*N^2).
+
+        state may either be a flat state or a grid.
+        """
+        board = np.asarray(state)
+        size = _isqrt(board.size)
+        board = board.reshape(size, size)
+
+        # number of unique values in each line of a sorted row is one more
+        # than the number of places where the value changes
+        score = 0
+
+        for lines in [board, board.T]:
+            changes = np.diff(np.sort(lines, axis=1), axis=1)
+            score -= size + np.count_nonzero(changes)
+
+        return int(score)
+
+    def format_output(self, output):
+        """Returns the best state as a grid (list of rows)."""
+        return self.grid(output[0]), output[1]
+
+    @classmethod
+    def solve_many(cls, puzzles, n_jobs=None, restarts=3, seed=None,
+                   executor=None, max_pending=None, **kwargs):
+        """Solves many puzzles in worker processes, yielding a SolveResult for
+        each puzzle as soon as it's done (so not necessarily in order).
+
+        Puzzles are taken from the iterable as workers free up, and only a
+        bounded number of them are pending at any time, so any number of
+        puzzles may be given (e.g. a generator reading them from a file).
+
+        Parameters
+        ----------
+        puzzles : iterable
+            The puzzles to solve.
+
+        n_jobs : int, optional
+            Default is None.
+
+            Number of worker processes (None or -1 means one per CPU). If 1,
+            the puzzles are solved one by one in the current process.
+
+        restarts : int, optional
+            Default is 3.
+
+            Number of times an unsolved puzzle is tried again, each time
+            refilled and annealed with a fresh seed. (Each anneal stops as
+            soon as the puzzle is solved.)
+
+        seed : int, optional
+            Default is None.
+
+            Seed from which the seeds of the attempts at each puzzle are
+            derived.
+
+        executor : concurrent.futures.Executor, optional
+            Default is None.
+
+            Executor to use instead of creating a pool of n_jobs processes.
+            It is not shut down afterwards.
+
+        max_pending : int, optional
+            Default is twice the number of workers.
+
+            Maximum number of puzzles submitted but not yet yielded.
+
+        Any other keyword arguments are passed to the SudokuSolver (e.g.
+        max_steps).
         """
+        if n_jobs in [None, -1]:
+            n_jobs = os.cpu_count()
+
+        if max_pending is None:
+            max_pending = 2*n_jobs
+
+        seeds = np.random.SeedSequence(seed)
+        tasks = ((index, puzzle, helpers.spawn_seeds(seeds.spawn(1)[0],
+                                                     restarts + 1))
+                 for index, puzzle in enumerate(puzzles))
+
+        if executor is None and n_jobs == 1:
+            for index, puzzle, attempt_seeds in tasks:
+                yield _solve(cls, index, puzzle, attempt_seeds, kwargs)
+            return
+
+        if executor is None:
+            with concurrent.futures.ProcessPoolExecutor(n_jobs) as executor:
+                yield from cls._solve_pending(executor, tasks, max_pending,
+                                              kwargs)
+        else:
+            yield from cls._solve_pending(executor, tasks, max_pending,
+                                          kwargs)
+
+    @classmethod
+    def _solve_pending(cls, executor, tasks, max_pending, kwargs):
+        """Keeps up to max_pending tasks submitted to executor, yielding their
+        results as they complete."""
+        pending = set()
+
+        for index, puzzle, attempt_seeds in tasks:
+            pending.add(executor.submit(_solve, cls, index, puzzle,
+                                        attempt_seeds, kwargs))
+
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    yield future.result()
+
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+def _solve(cls, index, puzzle, seeds, kwargs):
+    """Tries to solve a puzzle, once per seed, until it's solved. (Used by
+    SudokuSolver.solve_many; defined at the module level so it can be
+    pickled.)"""
+    best = None
+
+    for attempt, seed in enumerate(seeds, start=1):
+        solver = cls(puzzle, seed=seed, **kwargs)
+        board, energy = solver.anneal(target_energy=solver.optimum)
+
+        if best is None or energy < best.energy:
+            best = SolveResult(index, board, energy,
+                               energy == solver.optimum, attempt)
+
+        if best.solved:
+            break
+
+    return best._replace(attempts=attempt)
 
-        row_score = sum(-len(set(row)) for row in state)
-        col_score = sum(-len(set(col)) for col in map(list, zip(*state)))
 
-        return row_score + col_score
+def _isqrt(n):
+    """Integer square root of a (small) non-negative integer."""
+    return int(round(n ** 0.5))
@@ -1,10 +1,7 @@
 import sudoku
-import random
 
 
 if __name__ == '__main__':
-    random.seed(0)
-
     puzzle = [[0, 0, 0, 2, 6, 0, 7, 0, 1],
               [6, 8, 0, 0, 7, 0, 0, 9, 0],
               [1, 9, 0, 0, 0, 4, 5, 0, 0],
@@ -26,7 +23,7 @@ if __name__ == '__main__':
                 [7, 6, 3, 4, 1, 8, 2, 5, 9]]
 
     max_steps = 1000
-    solver = sudoku.SudokuSolver(puzzle, max_steps=max_steps)
+    solver = sudoku.SudokuSolver(puzzle, max_steps=max_steps, seed=0)
 
     print("Solving puzzle with max_steps = {}:".format(max_steps))
     solver.pretty_print(solver.puzzle)
@@ -36,7 +33,7 @@ if __name__ == '__main__':
     solver.pretty_print(solver.best_state)
     print("Final Energy: {}".format(solver.best_energy))
 
-    if solver.state == solution:
+    if solver.grid(solver.best_state) == solution:
         print("Solved correctly!")
     else:
         print("Not quite solved. Try increasing max_steps.")
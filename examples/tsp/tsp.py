@@ -10,6 +10,18 @@ class TravelingSalesPerson(anneal.BaseAnnealer):
     Tries to find the shortest route connecting a given list of cities (points
     in the plane). The energy is given by the length of the route, and
     a neighbor is generated by reversing a random subroute of the state.
+
+    Moves are 2-opt moves (subroute reversals), whose change in energy only
+    depends on the two edges they replace, and are applied in place.
+
+    States are routes given as permutations of the indices of the cities
+    (int32 arrays). The distances between cities are precomputed, unless
+    there are more than max_matrix_cities of them (in which case they are
+    computed from the coordinates when needed).
+
+    Unless n_neighbors is None, a list of the n_neighbors nearest cities to
+    each city is built, and moves are only proposed that would connect a
+    city to one of them.
     """
 
     def __init__(self, cities, *args, **kwargs):
@@ -18,57 +30,162 @@ class TravelingSalesPerson(anneal.BaseAnnealer):
         if not n_cities > 0:
             raise ValueError("cities must be a non-empty list.")
 
-        initial_state = np.array(cities, copy=True)
-        np.random.shuffle(initial_state)
+        self.cities = np.array(cities, dtype=float)
+
+        max_matrix_cities = kwargs.get("max_matrix_cities", 2000)
+
+        if n_cities <= max_matrix_cities:
+            self.distances = helpers.distance_matrix(self.cities)
+        else:
+            self.distances = None
+
+        n_neighbors = kwargs.get("n_neighbors", 10)
+
+        if n_neighbors is not None:
+            self.candidates = helpers.nearest_neighbors(self.cities,
+                                                        n_neighbors)
+        else:
+            self.candidates = None
+
+        # inverse of a state (see positions)
+        self._positions = None
+        self._positions_of = None
+
+        # the generator is needed for the initial state, so it's created
+        # here and passed on
+        self.reseed(kwargs.get("seed", None), kwargs.get("rng", None))
+        kwargs["rng"] = self.rng
+
+        initial_state = self.rng.permutation(n_cities).astype(np.int32)
         super().__init__(initial_state, *args, **kwargs)
 
+    def distance(self, i, j):
+        """Returns the distance between cities i and j. (i and j may also be
+        arrays of indices.)"""
+        if self.distances is not None:
+            return self.distances[i, j]
+        else:
+            return np.linalg.norm(self.cities[i] - self.cities[j], axis=-1)
+
+    def positions(self, state):
+        """Returns the array giving the index of each city in state.
+
+        This is cached for the last state it was computed for, and kept up to
+        date by apply when moves are made to that state in place.
+        """
+        if state is not self._positions_of:
+            self._positions = np.empty(len(state), dtype=np.int32)
+            self._positions[state] = np.arange(len(state), dtype=np.int32)
+            self._positions_of = state
+
+        return self._positions
+
+    def route(self, state=None):
+        """Returns the coordinates of the cities along the route given by
+        state (default is the current state)."""
+        if state is None:
+            state = self.state
+
+        return self.cities[np.asarray(state)]
+
     def energy_method(self, state):
         """Returns the total distance of the (closed) route given by state."""
-        total_distance = 0
+        state = np.asarray(state)
+        return float(self.distance(state, np.roll(state, -1)).sum())
+
+    def propose(self, state):
+        """Returns a random 2-opt move, i.e. a subroute to reverse, given by
+        its start index and its length (which is between 2 and n - 2). Routes
+        of less than four cities can't be changed, so None is returned for
+        them.
+
+        If there are candidate lists, a random city and one of its nearest
+        neighbors are picked, and the subroute after the city up to the
+        neighbor is reversed, so that the two become connected. (If they
+        already are, a uniformly random move is made instead.)
+        """
         n = len(state)
 
-        for i in range(n):
-            total_distance += helpers.distance(state[(i + 1) % n],
-                                               state[i % n])
+        if n < 4:
+            return None
 
-        return total_distance
+        start = self.randrange(n)
+
+        if self.candidates is not None:
+            city = state[start]
+            neighbor = self.candidates[city,
+                                       self.randrange(self.candidates
+                                                      .shape[1])]
+            length = (self.positions(state)[neighbor] - start) % n
+
+            if 2 <= length <= n - 2:
+                return (start + 1) % n, length
+
+        return start, 2 + self.randrange(n - 3)
+
+    def delta_energy(self, state, move):
+        """Returns the change in length of the route caused by a 2-opt move.
+
+        Reversing a subroute only replaces the two edges at its ends, so only
+        four distances are needed.
+        """
+        if move is None:
+            return 0
 
-    def neighbor(self, state):
-        """Reverses a random subroute."""
         n = len(state)
-        neighbor = np.copy(state)
+        start, length = move
+
+        # the subroute b ... c is reversed, so a-b, c-d become a-c, b-d
+        a, b = state[start - 1], state[start]
+        c, d = state[(start + length - 1) % n], state[(start + length) % n]
+
+        return float(self.distance(a, c) + self.distance(b, d) -
+                     self.distance(a, b) - self.distance(c, d))
+
+    def apply(self, state, move):
+        """Applies a 2-opt move to state (in place).
+
+        If the subroute wraps around the end of the array, the rest of the
+        route is reversed instead. This gives the same (closed) route, just
+        traversed in the other direction, and only takes a single slice.
+        """
+        if move is None:
+            return state
 
-        # start of the subroute
-        subroute_start = np.random.randint(n)
+        start, length = move
+        end = start + length
 
-        # length of the subroute
-        subroute_length = np.random.randint(2, n-1)
+        if end > len(state):
+            start, end = end - len(state), start
 
-        for i in range(subroute_start, subroute_start + subroute_length // 2):
-            a = i % n
-            b = (subroute_length + subroute_start - i + subroute_start) % n
-            neighbor[[a, b]] = neighbor[[b, a]]
+        state[start:end] = state[start:end][::-1]
 
-        return neighbor
+        if state is self._positions_of:
+            self._positions[state[start:end]] = np.arange(start, end,
+                                                          dtype=np.int32)
+
+        return state
+
+    def undo(self, state, move):
+        """Reverts a 2-opt move (which is its own inverse)."""
+        return self.apply(state, move)
+
+    def neighbor(self, state):
+        """Reverses a random subroute."""
+        return self.apply(np.copy(state), self.propose(state))
 
     def copy_method(self, state):
         return np.copy(state)
 
     def plot_state(self, state=None):  # pragma: no cover
-        if state is None:
-            state = np.copy(self.state)
-        else:
-            state = np.copy(state)
-
-        state = np.array(state).T
-        x, y = np.column_stack((state, state[:, 0]))
+        route = self.route(state).T
+        x, y = np.column_stack((route, route[:, 0]))
 
         plt.plot(x, y)
         plt.show()
 
     def brute_force(self):
-        cities = np.copy(self.initial_state)
-        n_cities = len(cities)
+        n_cities = len(self.cities)
 
         if n_cities > 10:  # pragma: no cover
             raise RuntimeError("This is only intended for testing small-sized "
@@ -76,15 +193,15 @@ class TravelingSalesPerson(anneal.BaseAnnealer):
                                "of cities is 10. (The current length of "
                                "cities is {}.)".format(n_cities))
 
-        best_state = np.copy(cities)
-        best_energy = self.energy_method(cities)
-
-        possible_solutions = permutations(cities)
+        best_state = np.copy(self.initial_state)
+        best_energy = self.energy_method(best_state)
 
-        for solution in possible_solutions:
+        # routes are cycles, so we can always start from the first city
+        for rest in permutations(range(1, n_cities)):
+            solution = np.array((0,) + rest, dtype=np.int32)
             energy = self.energy_method(solution)
             if energy < best_energy:
-                best_state = np.copy(solution)
+                best_state = solution
                 best_energy = energy
 
         return best_state, best_energy
@@ -1,5 +1,4 @@
 import tsp
-import random
 import logging
 import numpy as np
 
@@ -8,14 +7,13 @@ logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 
 np.random.seed(0)
-random.seed(0)
 
 n_points = 20
 max_steps = 6000
 cities = np.random.rand(n_points, 2)
 
 print("Finding shortest path for:\n\n{}\n".format(cities))
-solver = tsp.TravelingSalesPerson(cities, max_steps)
+solver = tsp.TravelingSalesPerson(cities, max_steps, seed=0)
 _, energy = solver.anneal(verbose=2)
 
 print("Shortest path length found: {}".format(energy))
@@ -1,5 +1,6 @@
 from anneal import anneal
 import pytest
+import random
 
 
 class TrivialAnnealer(anneal.BaseAnnealer):
@@ -39,6 +40,125 @@ class SmallTempAnnealer(PlusOneAnnealer):
         return 1e-128  # "never" accept new states; p = exp(-1/temp)
 
 
+class CountingAnnealer(PlusOneAnnealer):
+    def __init__(self):
+        self.n_energy_calls = 0
+        super().__init__()
+
+    def energy_method(self, state):
+        self.n_energy_calls += 1
+        return state
+
+
+class PlusOneMoveAnnealer(CountingAnnealer):
+    """PlusOneAnnealer using the move protocol."""
+    def propose(self, state):
+        return 1
+
+    def delta_energy(self, state, move):
+        return move
+
+    def apply(self, state, move):
+        return state + move
+
+
+class InPlaceAnnealer(anneal.BaseAnnealer):
+    """Annealer whose state is a list [n] which is increased by one in place
+    every step. Counts its calls to copy_method."""
+    def __init__(self):
+        self.n_copies = 0
+        super().__init__(initial_state=[0])
+
+    def energy_method(self, state):
+        return state[0]
+
+    def neighbor(self, state):  # pragma: no cover
+        raise AssertionError("neighbor shouldn't be used in in-place mode.")
+
+    def propose(self, state):
+        return 1
+
+    def apply(self, state, move):
+        state[0] += move
+        return state
+
+    def undo(self, state, move):
+        state[0] -= move
+        return state
+
+    def copy_method(self, state):
+        self.n_copies += 1
+        return list(state)
+
+    def temperature(self, step):
+        return 1e128
+
+
+class InPlaceMoveAnnealer(InPlaceAnnealer):
+    """In-place annealer which also defines delta_energy."""
+    def delta_energy(self, state, move):
+        return move
+
+    def undo(self, state, move):  # pragma: no cover
+        raise AssertionError("undo shouldn't be needed with delta_energy.")
+
+
+class SmallTempInPlaceAnnealer(InPlaceAnnealer):
+    def temperature(self, step):
+        return 1e-128
+
+
+class RandomAnnealer(anneal.BaseAnnealer):
+    """Annealer whose neighbors are random numbers in [0, 1)."""
+    def __init__(self):
+        super().__init__(initial_state=1, max_steps=100)
+
+    def energy_method(self, state):
+        return state
+
+    def neighbor(self, state):
+        return random.random()
+
+
+class LandscapeAnnealer(anneal.BaseAnnealer):
+    """Annealer walking left and right along a fixed list of energies, which
+    can list its moves (for rejection-free mode)."""
+    landscape = [3, 1, 2, 0, 4]
+
+    def __init__(self):
+        super().__init__(initial_state=0, max_steps=100)
+
+    def energy_method(self, state):
+        return self.landscape[state]
+
+    def neighbor(self, state):  # pragma: no cover
+        raise AssertionError("neighbor shouldn't be used.")
+
+    def moves(self, state):
+        return [-1, 1]
+
+    def delta_energy(self, state, move):
+        return (self.energy_method(self.apply(state, move)) -
+                self.energy_method(state))
+
+    def apply(self, state, move):
+        return min(max(state + move, 0), len(self.landscape) - 1)
+
+
+def crash_after(annealer, method, n_calls):
+    """Makes a given method of annealer raise a RuntimeError once it has been
+    called n_calls times."""
+    original = getattr(annealer, method)
+    calls = iter(range(n_calls))
+
+    def crashing(*args):
+        if next(calls, None) is None:
+            raise RuntimeError("Crashed.")
+        return original(*args)
+
+    setattr(annealer, method, crashing)
+
+
 @pytest.fixture
 def trivial_annealer():
     """Annealer with constant (zero) energy and constant (zero) state."""
@@ -63,3 +183,46 @@ def plus_one_annealer():
 def small_temp_annealer():
     """Annealer with a constant small temperature."""
     return SmallTempAnnealer()
+
+
+@pytest.fixture
+def counting_annealer():
+    """Plus-one annealer that counts its calls to energy_method."""
+    return CountingAnnealer()
+
+
+@pytest.fixture
+def plus_one_move_annealer():
+    """Plus-one annealer which takes steps via propose/delta_energy/apply."""
+    return PlusOneMoveAnnealer()
+
+
+@pytest.fixture
+def in_place_annealer():
+    """Annealer which applies moves to its state in place (and always accepts
+    them)."""
+    return InPlaceAnnealer()
+
+
+@pytest.fixture
+def small_temp_in_place_annealer():
+    """In-place annealer which (almost) never accepts moves."""
+    return SmallTempInPlaceAnnealer()
+
+
+@pytest.fixture
+def in_place_move_annealer():
+    """In-place annealer which computes energy changes with delta_energy."""
+    return InPlaceMoveAnnealer()
+
+
+@pytest.fixture
+def landscape_annealer():
+    """Annealer with an enumerable set of moves."""
+    return LandscapeAnnealer()
+
+
+@pytest.fixture
+def random_annealer():
+    """Annealer with random neighbors."""
+    return RandomAnnealer()
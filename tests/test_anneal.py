@@ -1,9 +1,15 @@
-from anneal import anneal
+from anneal import anneal, schedules
+from tests.conftest import crash_after
 from collections import deque
+import concurrent.futures
 import logging
+import math
+import numpy as np
 import pytest
 import random
 import sys
+import threading
+import time
 
 
 def test_initialized_without_abstract_methods():
@@ -136,3 +142,500 @@ def test_anneal_with_best_state_specified(plus_one_annealer):
 
     assert best_state == -200
     assert best_energy == -200
+
+
+def test_energy_evaluated_once_per_step(counting_annealer):
+    counting_annealer.anneal(max_steps=100)
+    n_calls = counting_annealer.n_energy_calls
+
+    _ = counting_annealer.energy, counting_annealer.best_energy
+
+    # one call per reset (in __init__ and anneal), then one per step
+    assert n_calls == 2 + 100
+    assert counting_annealer.n_energy_calls == n_calls
+    assert counting_annealer.energy == counting_annealer.state == 100
+    assert counting_annealer.best_energy == 0
+
+
+def test_uses_moves(plus_one_annealer, plus_one_move_annealer):
+    assert not plus_one_annealer.uses_moves
+    assert plus_one_move_annealer.uses_moves
+
+
+def test_anneal_with_moves(plus_one_move_annealer):
+    state, energy = plus_one_move_annealer.anneal(max_steps=100)
+
+    assert plus_one_move_annealer.state == plus_one_move_annealer.energy == 100
+    assert (state, energy) == (0, 0)
+
+    # energy_method is only used when resetting
+    assert plus_one_move_annealer.n_energy_calls == 2
+
+
+def test_in_place(plus_one_move_annealer, in_place_annealer):
+    assert not plus_one_move_annealer.in_place
+    assert in_place_annealer.in_place
+
+
+def test_in_place_accepted_moves_are_kept(in_place_annealer):
+    in_place_annealer.anneal(max_steps=100)
+
+    assert in_place_annealer.state == [100]
+    assert in_place_annealer.energy == 100
+    assert in_place_annealer.best_state == [0]
+
+
+def test_in_place_rejected_moves_are_undone(small_temp_in_place_annealer):
+    annealer = small_temp_in_place_annealer
+    n_copies = annealer.n_copies
+
+    annealer.anneal(max_steps=100)
+
+    assert annealer.state == [0]
+    assert annealer.energy == 0
+
+    # only the state and best state are copied when resetting
+    assert annealer.n_copies - n_copies == 2
+
+
+def test_in_place_with_delta_energy(in_place_move_annealer):
+    in_place_move_annealer.anneal(max_steps=100)
+
+    assert in_place_move_annealer.state == [100]
+    assert in_place_move_annealer.energy == 100
+
+
+@pytest.mark.parametrize("delta, temp, accepted", [
+        (-1, 0, True),
+        (0, 0, False),
+        (1, 0, False),
+        (0, 1, True),
+        (1e308, 1e-308, False),
+        (-1e308, 1e-308, True),
+        (1e-300, 1e300, True),
+        (1, math.inf, True)
+        ])
+def test_accept_state_at_extremes(trivial_annealer, delta, temp, accepted):
+    assert trivial_annealer._accept_state(delta, temp) == accepted
+
+
+def test_rejection_free(landscape_annealer):
+    landscape_annealer.reseed(0)
+    landscape_annealer.anneal(schedule=schedules.Linear(1e9, 1e9),
+                              rejection_free=True)
+
+    # every step moves (or stays put at an end of the landscape)
+    assert landscape_annealer.step == 100
+    assert landscape_annealer.best_state == 3
+    assert (landscape_annealer.energy ==
+            landscape_annealer.energy_method(landscape_annealer.state))
+
+
+def test_rejection_free_at_zero_temperature(landscape_annealer):
+    landscape_annealer.reseed(0)
+    landscape_annealer.anneal(schedule=schedules.Linear(0, 0),
+                              rejection_free=True)
+
+    # only downhill (or flat) moves can be made, so the annealer gets stuck
+    # at the local minimum
+    assert landscape_annealer.state == 1
+    assert landscape_annealer.energy == 1
+
+
+def test_rejection_free_requires_moves(plus_one_move_annealer):
+    assert not plus_one_move_annealer.can_enumerate_moves
+
+    with pytest.raises(ValueError):
+        plus_one_move_annealer.anneal(rejection_free=True)
+
+
+@pytest.mark.parametrize("backend", ["process", "thread"])
+def test_parallel_run(plus_one_annealer, backend):
+    states, energies = plus_one_annealer.run(4, n_jobs=2, backend=backend,
+                                             best_state=-1)
+
+    assert states == energies == [-1] * 4
+    assert len(plus_one_annealer.last_runs) == 4
+
+    for result in plus_one_annealer.last_runs:
+        assert result.exit.startswith("Reached max steps")
+        assert result.time >= 0
+        assert result.seed is not None
+
+
+def test_parallel_run_with_executor(plus_one_annealer):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        _, energies = plus_one_annealer.run(3, executor=executor,
+                                            max_steps=10)
+
+    assert energies == [0] * 3
+    assert plus_one_annealer.max_steps == 10
+
+
+def test_seeded_runs_are_reproducible(random_annealer):
+    serial = random_annealer.run(4, seed=0)
+    parallel = random_annealer.run(4, seed=0, n_jobs=2)
+
+    assert serial == parallel
+    assert len(set(serial[1])) == 4
+
+
+def test_parallel_run_with_bad_options(trivial_annealer):
+    with pytest.raises(ValueError):
+        trivial_annealer.run(2, backend="foo")
+
+    with pytest.raises(ValueError):
+        trivial_annealer.run(2, n_jobs=2, pickle=True)
+
+    with pytest.raises(ValueError):
+        trivial_annealer.run(2, n_jobs=2, checkpoint_every=10)
+
+
+def test_target_energy(plus_one_annealer):
+    plus_one_annealer.temperature = lambda step: 1e-128
+
+    # plus_one_annealer never accepts anything at this temperature
+    plus_one_annealer.anneal(target_energy=-1)
+    assert plus_one_annealer.last_exit.startswith("Reached max steps")
+
+    # the initial state already meets the target
+    plus_one_annealer.anneal(target_energy=0)
+    assert plus_one_annealer.last_exit == \
+        "Reached target energy (best energy = 0)."
+    assert plus_one_annealer.step == 0
+
+
+def test_target_energy_reached(random_annealer):
+    random.seed(0)
+    random_annealer.anneal(max_steps=10000, target_energy=0.01)
+
+    assert random_annealer.best_energy <= 0.01
+    assert random_annealer.step < 10000
+    assert random_annealer.last_exit.startswith("Reached target energy")
+
+
+def test_is_optimal_override(random_annealer):
+    random_annealer.is_optimal = lambda energy: energy < 0.5
+
+    random.seed(0)
+    random_annealer.anneal(max_steps=10000)
+
+    assert random_annealer.best_energy < 0.5
+    assert random_annealer.last_exit.startswith("Reached target energy")
+
+
+def test_time_limit(random_annealer):
+    random_annealer.anneal(max_steps=10**9, time_limit=0.05)
+
+    assert random_annealer.last_exit.startswith("Reached time limit")
+    assert 0 < random_annealer.step < 10**9
+    assert random_annealer.step % 100 == 0
+
+
+def test_deadline(random_annealer):
+    random_annealer.anneal(max_steps=10**9, deadline=time.time() - 1,
+                           check_interval=10)
+
+    assert random_annealer.last_exit.startswith("Reached deadline")
+    assert random_annealer.step == 10
+
+    # a time limit which ends first is reported as such
+    random_annealer.anneal(max_steps=10**9, time_limit=0.01,
+                           deadline=time.time() + 60)
+    assert random_annealer.last_exit.startswith("Reached time limit")
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_run_with_deadline(random_annealer, n_jobs):
+    start = time.time()
+    random_annealer.run(200, n_jobs=n_jobs, backend=n_jobs and "thread",
+                        max_steps=10**9, deadline=start + 0.1)
+
+    # no run is started after the deadline
+    assert time.time() - start < 5
+    assert 0 < len(random_annealer.last_runs) <= 2
+    assert all(r.exit.startswith("Reached deadline")
+               for r in random_annealer.last_runs)
+
+    random_annealer.run(2, max_steps=10, deadline=start)
+    assert random_annealer.last_runs == []
+
+
+def test_cancel(random_annealer):
+    timer = threading.Timer(0.05, random_annealer.cancel)
+    timer.start()
+
+    random_annealer.anneal(max_steps=10**9)
+    timer.join()
+
+    assert random_annealer.last_exit == "Cancelled."
+    assert random_annealer.step < 10**9
+
+    # cancelling only applies to the current run
+    random_annealer.anneal(max_steps=10)
+    assert random_annealer.last_exit.startswith("Reached max steps")
+
+
+def test_cancel_run(random_annealer):
+    timer = threading.Timer(0.05, random_annealer.cancel)
+    timer.start()
+
+    random_annealer.run(10**6, max_steps=10)
+    timer.join()
+
+    assert len(random_annealer.last_runs) < 10**6
+
+
+@pytest.mark.parametrize("backend", ["process", "thread"])
+def test_cancel_parallel_run(random_annealer, backend):
+    timer = threading.Timer(0.2, random_annealer.cancel)
+    timer.start()
+
+    start = time.time()
+    random_annealer.run(8, n_jobs=2, backend=backend, max_steps=10**8)
+    timer.join()
+
+    # the runs in progress are stopped, and the others never start
+    assert time.time() - start < 30
+    assert len(random_annealer.last_runs) < 8
+    assert all(r.exit == "Cancelled." for r in random_annealer.last_runs)
+
+
+def test_time_schedule(random_annealer):
+    max_steps = 10**9
+    schedule_steps = []
+
+    def temperature(step):
+        schedule_steps.append(step)
+        return 1 - step/max_steps
+
+    random_annealer.temperature = temperature
+    random_annealer.anneal(max_steps=max_steps, time_limit=0.1,
+                           time_schedule=True, check_interval=10)
+
+    assert 0.5*max_steps < max(schedule_steps) < max_steps
+
+
+def test_time_schedule_without_time_limit(random_annealer):
+    with pytest.raises(ValueError):
+        random_annealer.anneal(time_schedule=True)
+
+
+def test_pickle_records(plus_one_annealer, tmpdir):
+    file = str(tmpdir.join("plus_one.pickle"))
+    plus_one_annealer.anneal(max_steps=10, pickle=True, pickle_file=file)
+
+    records = plus_one_annealer.unpickle_records()
+
+    assert [r.step for r in records] == list(range(11))
+    assert [r.energy for r in records] == list(range(11))
+    assert records[0].temperature is None
+    assert all(r.temperature == 1e128 for r in records[1:])
+    assert plus_one_annealer.unpickle_states(file) == list(range(11))
+
+
+def test_pickle_record_every(plus_one_annealer, tmpdir):
+    file = str(tmpdir.join("plus_one.pickle"))
+    plus_one_annealer.anneal(max_steps=10, pickle=True, pickle_file=file,
+                             record_every=3, record_buffer=2)
+
+    records = plus_one_annealer.unpickle_records()
+
+    assert [r.step for r in records] == [0, 3, 6, 9]
+    assert [r.state for r in records] == [0, 3, 6, 9]
+
+
+def test_pickle_in_place_states(in_place_annealer, tmpdir):
+    file = str(tmpdir.join("in_place.pickle"))
+    in_place_annealer.anneal(max_steps=5, pickle=True, pickle_file=file)
+
+    states = in_place_annealer.unpickle_states()
+
+    # the state is modified in place, but each record keeps its own copy
+    assert len(states) > 1
+    assert states[0] != states[-1]
+
+
+def test_iter_states(plus_one_annealer, tmpdir):
+    file = str(tmpdir.join("plus_one.pickle"))
+    plus_one_annealer.anneal(max_steps=10, pickle=True, pickle_file=file)
+
+    assert list(plus_one_annealer.iter_states(step=5)) == [0, 5, 10]
+    assert list(plus_one_annealer.iter_states(last=2)) == [9, 10]
+    assert [r.step for r in plus_one_annealer.iter_records(file, 2, 4)] == \
+        [2, 3]
+
+
+def test_resume_from_checkpoint(random_annealer, tmpdir):
+    expected_file = str(tmpdir.join("expected.pickle"))
+    file = str(tmpdir.join("resumed.pickle"))
+    checkpoint_file = str(tmpdir.join("random.checkpoint"))
+
+    random.seed(0)
+    random_annealer.reseed(0)
+    expected = random_annealer.anneal(pickle=True, pickle_file=expected_file)
+    expected_records = random_annealer.unpickle_records()
+
+    random.seed(0)
+    random_annealer.reseed(0)
+    crash_after(random_annealer, "neighbor", 70)
+
+    with pytest.raises(RuntimeError):
+        random_annealer.anneal(pickle=True, pickle_file=file,
+                               checkpoint_every=25,
+                               checkpoint_file=checkpoint_file)
+
+    assert random_annealer.last_checkpoint == checkpoint_file
+
+    del random_annealer.neighbor
+    random.seed(1)
+    random_annealer.reseed(1)
+
+    assert random_annealer.anneal(resume_from=checkpoint_file) == expected
+    assert random_annealer.unpickle_records(file) == expected_records
+
+
+def test_resume_rejection_free(landscape_annealer, tmpdir):
+    file = str(tmpdir.join("landscape.pickle"))
+    checkpoint_file = str(tmpdir.join("landscape.checkpoint"))
+    options = dict(max_steps=3000, schedule=schedules.Exponential(3, 0.3),
+                   rejection_free=True, pickle=True, record_every=1)
+
+    landscape_annealer.reseed(1)
+    landscape_annealer.anneal(pickle_file=str(tmpdir.join("expected")),
+                              **options)
+    expected_records = landscape_annealer.unpickle_records()
+
+    # checkpoints are written while the weights of the moves are out of date
+    # by up to rejection_free_tol
+    landscape_annealer.reseed(1)
+    crash_after(landscape_annealer, "apply", 5000)
+
+    with pytest.raises(RuntimeError):
+        landscape_annealer.anneal(pickle_file=file, checkpoint_every=503,
+                                  checkpoint_file=checkpoint_file, **options)
+
+    del landscape_annealer.apply
+    landscape_annealer.reseed(2)
+    landscape_annealer.anneal(resume_from=checkpoint_file)
+
+    assert landscape_annealer.unpickle_records(file) == expected_records
+
+
+@pytest.mark.parametrize("schedule", [
+        lambda step: 1,
+        schedules.FunctionSchedule(lambda step: 1)
+        ])
+def test_checkpoint_unpicklable_options(random_annealer, tmpdir, schedule):
+    checkpoint_file = str(tmpdir.join("random.checkpoint"))
+
+    with pytest.raises(ValueError):
+        random_annealer.anneal(schedule=schedule, checkpoint_every=10,
+                               checkpoint_file=checkpoint_file)
+
+    assert random_annealer.step == 0
+    assert not tmpdir.listdir()
+
+    # without checkpoints, any function may be given
+    random_annealer.anneal(max_steps=20, schedule=schedule)
+
+
+def test_checkpoints_are_replaced(random_annealer, tmpdir):
+    checkpoint_file = str(tmpdir.join("random.checkpoint"))
+    random_annealer.anneal(checkpoint_every=10,
+                           checkpoint_file=checkpoint_file)
+
+    assert tmpdir.listdir() == [tmpdir.join("random.checkpoint")]
+
+
+def test_uniform(trivial_annealer):
+    n = 3*trivial_annealer.uniform_block_size // 2
+
+    trivial_annealer.reseed(0)
+    first = [trivial_annealer.uniform() for _ in range(n)]
+    trivial_annealer.reseed(0)
+    second = [trivial_annealer.uniform() for _ in range(n)]
+
+    assert first == second
+    assert len(set(first)) == n
+    assert all(0 <= u < 1 for u in first)
+    assert all(0 <= trivial_annealer.randrange(3) < 3 for _ in range(100))
+
+
+def test_reseed_with_rng(trivial_annealer):
+    rng = np.random.default_rng(0)
+    trivial_annealer.reseed(rng=rng)
+
+    assert trivial_annealer.rng is rng
+
+
+def test_schedule(random_annealer):
+    schedule = schedules.Exponential(10, 0.01)
+    random_annealer.anneal(schedule=schedule)
+
+    assert random_annealer.schedule is schedule
+
+
+def test_default_schedule(random_annealer, plus_one_annealer):
+    assert isinstance(random_annealer.schedule, schedules.Linear)
+    assert isinstance(plus_one_annealer.schedule, schedules.FunctionSchedule)
+
+
+def test_schedule_end(random_annealer):
+    schedule = schedules.Geometric(1, 0.5, t_min=0.01)
+    random_annealer.anneal(schedule=schedule)
+
+    assert random_annealer.step == schedule.length(random_annealer.max_steps)
+    assert random_annealer.last_exit.startswith("Reached end of schedule")
+
+
+@pytest.mark.parametrize("precomputed", [True, False])
+def test_temp_tol(random_annealer, precomputed):
+    # the temperature drops by 0.015 every step until step 50, and then stays
+    # at 0.5
+    piecewise = schedules.Piecewise([-1, 0.5, 1], [2, 0.5, 0.5])
+
+    if precomputed:
+        schedule = piecewise
+    else:
+        schedule = schedules.FunctionSchedule(lambda step:
+                                              piecewise(step, 100))
+
+    random_annealer.anneal(max_steps=100, schedule=schedule, temp_tol=0.005)
+
+    assert random_annealer.step == 51
+    assert random_annealer.last_exit.startswith("Reached temperature")
+
+
+def test_time_based_schedule(random_annealer):
+    schedule = schedules.TimeBased(schedules.Linear(), 0.05)
+    random_annealer.anneal(max_steps=10**9, schedule=schedule)
+
+    assert random_annealer.last_exit.startswith("Reached time limit")
+
+
+def test_calibrate(random_annealer):
+    random_annealer.anneal()
+    schedule = random_annealer.calibrate(n_samples=500)
+
+    assert isinstance(schedule, schedules.Exponential)
+    assert 0 < schedule.t_end < schedule.t0
+    assert random_annealer.step == 0
+    assert random_annealer.state == random_annealer.initial_state
+
+    # uphill moves are at most 1 (the states are in [0, 1))
+    assert schedule.t0 < 1 / -math.log(0.8)
+
+
+def test_calibrate_in_parallel(random_annealer):
+    schedule = random_annealer.calibrate(n_samples=500, n_jobs=2,
+                                         backend="thread",
+                                         schedule=schedules.Linear)
+
+    assert isinstance(schedule, schedules.Linear)
+    assert 0 < schedule.t_end < schedule.t0
+
+
+def test_calibrate_without_uphill_moves(trivial_annealer):
+    with pytest.raises(ValueError):
+        trivial_annealer.calibrate()
@@ -1,4 +1,7 @@
 from anneal import helpers
+import numpy as np
+import pickle
+import pytest
 
 
 def test_clip():
@@ -7,3 +10,136 @@ def test_clip():
 
     # item within bounds
     assert helpers.clip(0, -1, 1) == 0
+
+
+def test_distance_matrix():
+    points = [(0, 0), (3, 4), (0, 1)]
+    matrix = helpers.distance_matrix(points)
+
+    assert matrix.shape == (3, 3)
+    assert (matrix == matrix.T).all()
+    assert matrix[0, 1] == 5
+    assert matrix[1, 1] == 0
+
+
+@pytest.mark.parametrize("n_points, dim", [(1, 2), (10, 2), (500, 2),
+                                           (100, 3)])
+def test_nearest_neighbors(n_points, dim):
+    np.random.seed(0)
+    points = np.random.rand(n_points, dim)
+    k = 5
+
+    matrix = helpers.distance_matrix(points)
+    np.fill_diagonal(matrix, np.inf)
+    expected = np.argsort(matrix, axis=1)[:, :min(k, n_points - 1)]
+
+    assert (helpers.nearest_neighbors(points, k) == expected).all()
+
+
+@pytest.mark.parametrize("scale", [(1000, 1), (1, 1000), (1, 0)])
+def test_nearest_neighbors_of_elongated_points(scale):
+    points = np.random.default_rng(0).random((2000, 2)) * scale
+    k = 5
+
+    matrix = helpers.distance_matrix(points)
+    np.fill_diagonal(matrix, np.inf)
+    expected = np.sort(matrix, axis=1)[:, :k]
+
+    neighbors = helpers.nearest_neighbors(points, k)
+
+    # (compared by distance, since points on a line may tie)
+    assert np.allclose(np.take_along_axis(matrix, neighbors, axis=1),
+                       expected)
+
+
+def test_nearest_neighbors_of_clustered_points():
+    rng = np.random.default_rng(0)
+    points = np.concatenate([rng.normal(center, 1e-3, size=(100, 2))
+                             for center in rng.random((5, 2))] +
+                            [rng.random((10, 2))])
+    k = 5
+
+    matrix = helpers.distance_matrix(points)
+    np.fill_diagonal(matrix, np.inf)
+    expected = np.argsort(matrix, axis=1)[:, :k]
+
+    assert (helpers.nearest_neighbors(points, k) == expected).all()
+
+
+def test_iter_pickled_objects(tmpdir):
+    file = str(tmpdir.join("objects.pickle"))
+
+    with open(file, 'wb') as f:
+        for i in range(10):
+            pickle.dump(i, f)
+
+    objects = helpers.iter_pickled_objects(file)
+
+    assert not isinstance(objects, list)
+    assert list(objects) == helpers.unpickle_objects(file) == list(range(10))
+    assert list(helpers.iter_pickled_objects(file, start=8)) == [8, 9]
+    assert list(helpers.iter_pickled_objects(file, 1, 8, 3)) == [1, 4, 7]
+    assert list(helpers.iter_pickled_objects(file, last=3)) == [7, 8, 9]
+    assert list(helpers.iter_pickled_objects(file, step=2, last=2)) == [6, 8]
+
+
+def test_pickle_atomically(tmpdir):
+    file = str(tmpdir.join("object.pickle"))
+
+    helpers.pickle_atomically([1, 2], file)
+    helpers.pickle_atomically([3], file)
+
+    assert helpers.unpickle_objects(file) == [[3]]
+    assert tmpdir.listdir() == [tmpdir.join("object.pickle")]
+
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        helpers.pickle_atomically(lambda: None, file)
+
+    assert helpers.unpickle_objects(file) == [[3]]
+    assert tmpdir.listdir() == [tmpdir.join("object.pickle")]
+
+
+def test_ring_buffer():
+    values = np.random.default_rng(0).normal(1e6, 1, size=1000)
+    buffer = helpers.RingBuffer(64)
+
+    assert len(buffer) == 0
+    assert buffer.mean() == buffer.variance() == 0
+
+    for i, value in enumerate(values, start=1):
+        buffer.append(value)
+
+        if i in [1, 10, 64, 100, 1000]:
+            last = values[max(i - 64, 0):i]
+
+            assert len(buffer) == len(last)
+            assert np.isclose(buffer.mean(), last.mean())
+            assert np.isclose(buffer.variance(), last.var(), rtol=1e-3,
+                              atol=1e-6)
+
+
+def test_sum_tree():
+    weights = np.random.default_rng(0).random(11)
+    weights[[2, 7]] = 0
+    tree = helpers.SumTree(weights)
+
+    assert len(tree) == 11
+    assert np.isclose(tree.total, weights.sum())
+
+    ends = np.cumsum(weights)
+
+    for value in np.linspace(0, tree.total, 50, endpoint=False):
+        assert tree.find(value) == np.searchsorted(ends, value, side="right")
+
+    weights[[0, 7, 10]] = [0, 5, 0.5]
+    tree.update([0, 7, 10], weights[[0, 7, 10]])
+
+    assert tree[7] == 5
+    assert np.isclose(tree.total, weights.sum())
+
+    counts = np.bincount([tree.sample(u) for u in
+                          np.random.default_rng(1).random(20000)],
+                         minlength=11)
+
+    assert counts[0] == counts[2] == 0
+    assert np.allclose(counts / 20000, weights / weights.sum(), atol=0.02)
@@ -1,8 +1,9 @@
 from examples.rvf.rvf import RvfSolver
-from anneal import helpers
+from anneal import helpers, schedules
+from tests.conftest import crash_after
+import math
 import numpy as np
 import pytest
-import random
 
 
 def rvf_1_basic(x):
@@ -64,10 +65,8 @@ def test_initialized_with_initial_point_out_of_bounds(function, point, bounds):
     ])
 def test_optimum_inside_bounds(function, initial_point, bounds, obj, actual,
                                seed):
-    random.seed(seed)
-    np.random.seed(seed)
-
-    solver = RvfSolver(function, initial_point, bounds, objective=obj)
+    solver = RvfSolver(function, initial_point, bounds, objective=obj,
+                       seed=seed)
     point, value = solver.anneal(max_steps=4000)
 
     # tolerances
@@ -85,10 +84,7 @@ def test_optimum_inside_bounds(function, initial_point, bounds, obj, actual,
         (rvf_3_basic, [1, 1, -1], [[-2, 2], [-2, 2], [-2, 2]], [-2, -2, -2])
     ])
 def test_optimum_on_bounds(function, initial_point, bounds, actual, seed):
-    random.seed(seed)
-    np.random.seed(seed)
-
-    solver = RvfSolver(function, initial_point, bounds)
+    solver = RvfSolver(function, initial_point, bounds, seed=seed)
     point, value = solver.anneal(max_steps=4000)
 
     # tolerances
@@ -99,3 +95,165 @@ def test_optimum_on_bounds(function, initial_point, bounds, actual, seed):
 
     assert abs(value - function(*actual)) < tol_value
     assert helpers.distance(actual, point) < tol_point
+
+
+def rvf_2_scalar_only(x, y):
+    # math functions don't accept arrays
+    return math.sin(x) + y**2
+
+
+@pytest.mark.parametrize("function, vectorized", [
+        (rvf_2_basic, True),
+        (rvf_2_scalar_only, False)
+        ])
+def test_batch_energy(function, vectorized):
+    solver = RvfSolver(function, [0, 0], [[-2, 2], [-2, 2]])
+    states = np.random.random((10, 2))
+
+    energies = solver.batch_energy(states)
+
+    assert solver._vectorized == vectorized
+    assert np.allclose(energies, [function(*state) for state in states])
+
+
+def test_batch_energy_forced_vectorized():
+    solver = RvfSolver(rvf_2_scalar_only, [0, 0], [[-2, 2], [-2, 2]])
+
+    with pytest.raises(ValueError):
+        solver.batch_energy(np.zeros((3, 2)), vectorized=True)
+
+
+@pytest.mark.parametrize("function, obj, actual", [
+        (rvf_2_basic, 'min', [0, 0]),
+        (rvf_2_scalar_only, 'min', [-math.pi/2, 0]),
+        (lambda x, y: -rvf_2_basic(x, y), 'max', [0, 0])
+        ])
+def test_anneal_batch(function, obj, actual):
+    n_chains = 50
+    solver = RvfSolver(function, [1, 1], [[-2, 2], [-2, 2]], objective=obj,
+                       seed=0)
+    points, values = solver.anneal_batch(n_chains, max_steps=1000)
+
+    assert points.shape == (n_chains, 2)
+    assert values.shape == (n_chains,)
+
+    best = np.argmin(values) if obj == 'min' else np.argmax(values)
+
+    assert abs(values[best] - function(*actual)) < 0.1
+    assert helpers.distance(actual, points[best]) < 0.1
+
+
+@pytest.mark.parametrize("schedule", [
+        schedules.ModifiedLam(t0=5),
+        schedules.TimeBased(schedules.Linear(), 1)
+        ])
+def test_anneal_batch_with_unsupported_schedule(schedule):
+    solver = RvfSolver(rvf_2_basic, [1, 1], [[-2, 2], [-2, 2]], seed=0)
+
+    with pytest.raises(ValueError):
+        solver.anneal_batch(10, max_steps=10, schedule=schedule)
+
+
+@pytest.mark.parametrize("schedule, temp_tol", [
+        (schedules.Geometric(1, 0.9, t_min=0.01), -1),
+        (schedules.Piecewise([-1, 0.5, 0.6, 1], [10, 1, 1, 0]), 1e-9)
+        ])
+def test_anneal_batch_stops_like_anneal(schedule, temp_tol):
+    solver = RvfSolver(rvf_2_basic, [1, 1], [[-2, 2], [-2, 2]], seed=0)
+    steps = []
+
+    def take_step(state):
+        steps.append(solver.step)
+        return state
+
+    # the steps taken by anneal()
+    solver.neighbor = take_step
+    solver.anneal(max_steps=100, schedule=schedule, temp_tol=temp_tol)
+    n_steps = len(steps)
+
+    assert 0 < n_steps < 100
+
+    batch_energy = solver.batch_energy
+    calls = []
+
+    def counting_batch_energy(states, vectorized=None):
+        calls.append(len(states))
+        return batch_energy(states, vectorized)
+
+    solver.batch_energy = counting_batch_energy
+    solver.anneal_batch(3, max_steps=100, schedule=schedule,
+                        temp_tol=temp_tol)
+
+    # (the initial states are evaluated too)
+    assert len(calls) == n_steps + 1
+
+
+def test_adaptive_move_scale():
+    schedule = schedules.ModifiedLam(t0=1, adapt_scale=True, min_scale=1e-3)
+    solver = RvfSolver(rvf_2_basic, [1, 1], [[-2, 2], [-2, 2]], seed=0)
+    _, value = solver.anneal(max_steps=4000, schedule=schedule)
+
+    assert 1e-3 <= schedule.scale < 1
+    assert abs(value - rvf_2_basic(0, 0)) < 0.01
+
+    # the solver gets its own move scale back
+    assert solver.move_scale == 1
+
+
+def test_adaptive_move_scale_starts_from_solver():
+    schedule = schedules.ModifiedLam(t0=1, adapt_scale=True)
+    solver = RvfSolver(rvf_2_basic, [1, 1], [[-2, 2], [-2, 2]], seed=0,
+                       move_scale=0.5)
+    solver.anneal(max_steps=1, schedule=schedule)
+
+    assert schedule.scale in [0.5 * schedule.factor, 0.5 / schedule.factor]
+    assert solver.move_scale == 0.5
+
+    solver.anneal(max_steps=10)
+    assert solver.move_scale == 0.5
+
+    crash_after(solver, "neighbor", 100)
+
+    with pytest.raises(RuntimeError):
+        solver.anneal(max_steps=1000, schedule=schedule)
+
+    assert schedule.scale != 0.5
+    assert solver.move_scale == 0.5
+
+
+def test_resume_adaptive_move_scale(tmpdir):
+    expected_file = str(tmpdir.join("expected.pickle"))
+    file = str(tmpdir.join("resumed.pickle"))
+    checkpoint_file = str(tmpdir.join("rvf.checkpoint"))
+
+    def solver():
+        return RvfSolver(rvf_2_basic, [1, 1], [[-2, 2], [-2, 2]], seed=0)
+
+    def schedule():
+        return schedules.ModifiedLam(t0=1, adapt_scale=True, min_scale=1e-3)
+
+    expected = solver()
+    expected.anneal(max_steps=2000, schedule=schedule(), pickle=True,
+                    pickle_file=expected_file, record_every=1)
+
+    crashed = solver()
+    crash_after(crashed, "neighbor", 1700)
+
+    with pytest.raises(RuntimeError):
+        crashed.anneal(max_steps=2000, schedule=schedule(), pickle=True,
+                       pickle_file=file, record_every=1,
+                       checkpoint_every=500, checkpoint_file=checkpoint_file)
+
+    # the move scale reached by the schedule is restored on a new solver
+    resumed = solver()
+    resumed.anneal(resume_from=checkpoint_file)
+
+    assert resumed.schedule.scale == expected.schedule.scale
+    assert resumed.move_scale == expected.move_scale == 1
+    records = resumed.unpickle_records(file)
+    expected_records = expected.unpickle_records(expected_file)
+
+    assert len(records) == len(expected_records)
+    assert all(r.step == e.step and r.energy == e.energy and
+               np.array_equal(r.state, e.state)
+               for r, e in zip(records, expected_records))
@@ -0,0 +1,163 @@
+from anneal import schedules
+import math
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("schedule", [
+        schedules.Linear(),
+        schedules.Linear(5, 1),
+        schedules.Exponential(10, 0.1),
+        schedules.Geometric(10, 0.99),
+        schedules.Logarithmic(2),
+        schedules.LundyMees(10, 0.01),
+        schedules.Piecewise([0, 0.2, 1], [10, 1, 0]),
+        schedules.FunctionSchedule(lambda step: 1 / (step + 1))
+        ])
+def test_table_matches_temperatures(schedule):
+    n_steps = 100
+    table = schedule.table(n_steps)
+
+    assert len(table) == n_steps
+
+    for step in [0, 1, 50, 99]:
+        assert np.isclose(table[step], schedule(step, n_steps))
+
+
+def test_linear_is_default_temperature():
+    n_steps = 1000
+    table = schedules.Linear().table(n_steps)
+
+    assert list(table) == [1 - step/n_steps for step in range(n_steps)]
+
+
+def test_endpoints():
+    n_steps = 100
+
+    assert schedules.Exponential(10, 0.1)(n_steps, n_steps) == \
+        pytest.approx(0.1)
+    assert schedules.Logarithmic(2)(0, n_steps) == pytest.approx(2)
+    assert schedules.Piecewise([0, 0.2, 1], [10, 1, 0])(20, n_steps) == \
+        pytest.approx(1)
+
+
+@pytest.mark.parametrize("schedule", [
+        schedules.Geometric(10, 0.9, t_min=0.5),
+        schedules.Logarithmic(2, t_min=0.5),
+        schedules.LundyMees(10, 0.1, t_min=0.5)
+        ])
+def test_length(schedule):
+    n_steps = 10**6
+    length = schedule.length(n_steps)
+
+    assert schedule(length - 1, n_steps) >= 0.5
+    assert schedule(length, n_steps) < 0.5
+
+    assert schedule.length(10) == 10
+
+
+def test_no_t_min():
+    assert schedules.Geometric(10, 0.9).length(100) == 100
+
+
+def test_chunked_table(monkeypatch):
+    monkeypatch.setattr(schedules.Schedule, "chunk_size", 10)
+    schedule = schedules.Exponential(10, 0.1)
+    table = schedule.table(95)
+
+    assert table[50] == schedule(50, 95)
+    assert type(table[50]) is float
+    assert isinstance(table._chunk, np.ndarray)
+    assert len(table._chunk) == 10
+
+    assert list(table) == schedule.temperatures(np.arange(95), 95).tolist()
+    assert len(table._chunk) == 5
+
+    with pytest.raises(IndexError):
+        table[95]
+
+
+def test_table_stop(monkeypatch):
+    monkeypatch.setattr(schedules.Schedule, "chunk_size", 10)
+    schedule = schedules.Piecewise([-1, 0.5, 0.6, 1], [10, 1, 1, 0])
+    table = schedule.table(100, tol=1e-9)
+
+    table[0]
+    assert table.stop == math.inf
+
+    # a break is found even if the steps before it are skipped
+    table[90]
+    assert table.stop == 51
+
+    assert schedule.table(100).stop == math.inf
+
+
+def test_function_table_stop():
+    schedule = schedules.FunctionSchedule(lambda step: max(10 - step/10, 5))
+    table = schedule.table(100, tol=1e-9)
+
+    for step in range(51):
+        table[step]
+        assert table.stop == math.inf
+
+    table[51]
+    assert table.stop == 51
+
+
+@pytest.mark.parametrize("args", [
+        ([0, 1], [1]),
+        ([], []),
+        ([0.5, 0], [1, 0])
+        ])
+def test_invalid_piecewise(args):
+    with pytest.raises(ValueError):
+        schedules.Piecewise(*args)
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        schedules.Exponential(1, 0)
+
+    with pytest.raises(ValueError):
+        schedules.Geometric(1, 1.5)
+
+
+def test_acceptance_temperature():
+    # a single kind of uphill move is accepted with probability exp(-2/T)
+    temp = schedules.acceptance_temperature([-1, 0, 2, 2], 0.5)
+    assert temp == pytest.approx(2 / math.log(2))
+
+    deltas = np.random.default_rng(0).exponential(size=1000)
+    temp = schedules.acceptance_temperature(deltas, 0.1)
+    assert np.exp(-deltas / temp).mean() == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize("deltas, rate", [
+        ([-1, 0], 0.5),
+        ([1, 2], 1),
+        ([1, 2], 0)
+        ])
+def test_invalid_acceptance_temperature(deltas, rate):
+    with pytest.raises(ValueError):
+        schedules.acceptance_temperature(deltas, rate)
+
+
+def test_modified_lam_target():
+    target = schedules.ModifiedLam.target
+
+    assert target(0) == pytest.approx(1)
+    assert target(0.15) == target(0.5) == 0.44
+    assert target(1) == pytest.approx(0.001)
+
+
+def test_modified_lam_follows_target(plus_one_annealer):
+    # every step of plus_one_annealer costs 1, so it's accepted with
+    # probability exp(-1/T)
+    schedule = schedules.ModifiedLam(t0=1, window=100, factor=0.99)
+    plus_one_annealer.reseed(0)
+    plus_one_annealer.anneal(max_steps=10000, schedule=schedule)
+
+    assert schedule.temp < 1
+    assert schedule.acceptance_rate < 0.1
+    assert schedule.energy_std > 0
+    assert plus_one_annealer.schedule.table(10)[3] == schedule.temp
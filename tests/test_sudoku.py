@@ -1,7 +1,8 @@
 from examples.sudoku.sudoku import SudokuSolver
 from anneal import helpers
 import pytest
-import random
+import copy
+import numpy as np
 import os
 
 
@@ -48,7 +49,7 @@ def grid():
 
 def test_initialized_with_bad_puzzle():
     # bad shape
-    with pytest.raises(IndexError):
+    with pytest.raises(ValueError):
         SudokuSolver([], 1000)
 
     # bad values
@@ -65,6 +66,14 @@ def test_block_indices():
     assert sorted(test_indices) == sorted(actual_indices)
 
 
+def test_block_table():
+    blocks = SudokuSolver.block_table(9)
+
+    for b in range(9):
+        assert [divmod(cell, 9) for cell in blocks[b]] == \
+            SudokuSolver.block_indices(b)
+
+
 def test_fill_puzzle(puzzle_cols):
     # [[0,...,8],...,[0,...,8]] should fill in the puzzle
     # with 1-9 in the first column, and return the first
@@ -102,10 +111,9 @@ def test_energy_correct(puzzle_all_zeros, puzzle_valid_solution):
 
 
 def test_neighbor_switches_two_in_same_block(puzzle_valid, grid):
-    random.seed(0)
-    s = SudokuSolver(puzzle_valid)
-    state = s.initial_state
-    neighbor = s.neighbor(state)
+    s = SudokuSolver(puzzle_valid, seed=0)
+    state = s.grid(s.initial_state)
+    neighbor = s.grid(s.neighbor(s.initial_state))
 
     diffs = []
 
@@ -127,16 +135,14 @@ def test_neighbor_switches_two_in_same_block(puzzle_valid, grid):
 
 
 def test_neighbor_on_already_solved(puzzle_valid_solution):
-    random.seed(0)
-    s = SudokuSolver(puzzle_valid_solution)
+    s = SudokuSolver(puzzle_valid_solution, seed=0)
     state = s.initial_state
     neighbor = s.neighbor(state)
 
-    assert state == neighbor
+    assert (state == neighbor).all()
 
 
 def test_energy_break_on_solved_puzzle(tmpdir, puzzle_valid_solution):
-    random.seed(0)
     file = tmpdir.join(helpers.generate_filename(SudokuSolver, ".pickle"))
     rounds = 3
 
@@ -147,3 +153,180 @@ def test_energy_break_on_solved_puzzle(tmpdir, puzzle_valid_solution):
     states = s.unpickle_states()
 
     assert len(states) == rounds
+
+
+def test_delta_energy(puzzle_valid):
+    s = SudokuSolver(puzzle_valid, seed=0)
+    state = s.initial_state
+
+    for _ in range(50):
+        move = s.propose(state)
+        neighbor = s.apply(copy.deepcopy(state), move)
+
+        expected = s.energy_method(neighbor) - s.energy_method(state)
+
+        assert s.delta_energy(state, move) == expected
+
+
+def test_counts_follow_in_place_moves(puzzle_valid):
+    s = SudokuSolver(puzzle_valid, max_steps=500, seed=0)
+    assert s.in_place
+
+    s.anneal()
+
+    assert s.energy == s.energy_method(s.state)
+    assert s.best_energy == s.energy_method(s.best_state)
+
+    row_counts, col_counts = s.counts(s.state)
+    s._counts_of = None
+
+    assert s.counts(s.state) == (row_counts, col_counts)
+
+
+def test_swap_candidates():
+    unknown = [(0, 0), (4, 4), (1, 2), (8, 8), (3, 5), (5, 3)]
+    unknown = [9*i + j for i, j in unknown]
+
+    assert SudokuSolver.swap_candidates(unknown) == [[0, 11],
+                                                     [40, 32, 48]]
+
+
+def test_propose_picks_unknown_cells_in_same_block(puzzle_valid):
+    s = SudokuSolver(puzzle_valid, seed=0)
+    unknown = set(s.unknown)
+
+    for _ in range(50):
+        c1, c2 = s.propose(s.state)
+        (i1, j1), (i2, j2) = divmod(c1, 9), divmod(c2, 9)
+
+        assert c1 != c2
+        assert {c1, c2} <= unknown
+        assert (i1 // 3, j1 // 3) == (i2 // 3, j2 // 3)
+
+
+def solved_board(block_size):
+    """A valid solution of a board with the given block size."""
+    size = block_size**2
+    return [[(block_size*(row % block_size) + row // block_size + col) % size
+             + 1 for col in range(size)] for row in range(size)]
+
+
+@pytest.mark.parametrize("bad_puzzle", [
+        [[0] * 8 for _ in range(8)],
+        [[0] * 9 for _ in range(8)]
+        ])
+def test_initialized_with_bad_shape(bad_puzzle):
+    with pytest.raises(ValueError):
+        SudokuSolver(bad_puzzle)
+
+
+def test_state_is_flat_array(puzzle_valid):
+    s = SudokuSolver(puzzle_valid)
+
+    assert s.initial_state.shape == (81,)
+    assert s.initial_state.dtype == np.uint8
+    assert s.grid(s.initial_state)[0][3:5] == [2, 6]
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 4, 5])
+def test_larger_boards(block_size):
+    size = block_size**2
+    solution = solved_board(block_size)
+
+    puzzle = copy.deepcopy(solution)
+    for row in puzzle:
+        row[::2] = [0] * len(row[::2])
+
+    s = SudokuSolver(puzzle, seed=0)
+
+    assert s.optimum == -2*size**2
+    assert s.energy_method(solution) == s.optimum
+
+    for lines in [s.rows, s.cols, s.blocks]:
+        assert sorted(lines.ravel()) == list(range(size**2))
+
+        values = np.array(solution).ravel()[lines]
+        assert all(sorted(line) == list(range(1, size + 1))
+                   for line in values)
+
+    state = s.initial_state
+
+    for _ in range(20):
+        move = s.propose(state)
+        neighbor = s.apply(np.copy(state), move)
+
+        expected = s.energy_method(neighbor) - s.energy_method(state)
+        assert s.delta_energy(state, move) == expected
+
+
+def test_anneal_returns_grid(puzzle_valid, puzzle_valid_solution):
+    s = SudokuSolver(puzzle_valid, seed=0)
+    board, energy = s.anneal(max_steps=20000)
+
+    assert energy == -162
+    assert board == puzzle_valid_solution
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_solve_many(puzzle_valid, puzzle_valid_solution, n_jobs):
+    n_puzzles = 5
+    puzzles = (copy.deepcopy(puzzle_valid) for _ in range(n_puzzles))
+
+    results = list(SudokuSolver.solve_many(puzzles, n_jobs=n_jobs, seed=0,
+                                           max_steps=20000))
+
+    assert sorted(r.index for r in results) == list(range(n_puzzles))
+
+    for result in results:
+        assert result.solved
+        assert result.energy == -162
+        assert result.board == puzzle_valid_solution
+        assert result.attempts == 1
+
+
+def test_solve_many_restarts(puzzle_valid):
+    # far too few steps to solve the puzzle
+    result, = SudokuSolver.solve_many([puzzle_valid], n_jobs=1, restarts=2,
+                                      seed=0, max_steps=10)
+
+    assert not result.solved
+    assert result.attempts == 3
+    assert result.energy > -162
+
+
+def test_seed(puzzle_valid):
+    solvers = [SudokuSolver(puzzle_valid, seed=3) for _ in range(2)]
+
+    assert (solvers[0].state == solvers[1].state).all()
+    assert solvers[0].anneal(max_steps=500) == solvers[1].anneal(max_steps=500)
+
+
+def test_affected_moves(puzzle_valid):
+    s = SudokuSolver(puzzle_valid, seed=0)
+    state = s.initial_state
+    swaps = s.moves(state)
+
+    for k in range(0, len(swaps), 7):
+        before = [s.delta_energy(state, swap) for swap in swaps]
+        state = s.apply(np.copy(state), swaps[k])
+        after = [s.delta_energy(state, swap) for swap in swaps]
+
+        affected = set(s.affected_moves(state, swaps[k]))
+
+        assert k in affected
+        assert all(before[i] == after[i] for i in range(len(swaps))
+                   if i not in affected)
+
+
+def test_rejection_free(puzzle_valid, puzzle_valid_solution):
+    s = SudokuSolver(puzzle_valid, seed=0)
+    board, energy = s.anneal(max_steps=20000, rejection_free=True,
+                             target_energy=s.optimum)
+
+    assert energy == -162
+    assert board == puzzle_valid_solution
+    assert s.energy == s.energy_method(s.state)
+
+    # the energy keeps the type given by energy_method and delta_energy
+    assert type(energy) is type(s.energy_method(s.state))
+    assert isinstance(energy, int)
@@ -0,0 +1,66 @@
+from anneal.tempering import ParallelTemperingAnnealer
+from anneal import tempering
+import pytest
+
+
+@pytest.mark.parametrize("temperatures, swap_interval", [
+        ([1], 10),
+        ([0, 1], 10),
+        ([1, 2], 0)
+        ])
+def test_initialized_with_bad_values(random_annealer, temperatures,
+                                     swap_interval):
+    with pytest.raises(ValueError):
+        ParallelTemperingAnnealer(random_annealer, temperatures,
+                                  swap_interval=swap_interval)
+
+
+@pytest.mark.parametrize("processes", [True, False])
+def test_anneal(random_annealer, processes):
+    temperatures = [0.1, 0.2, 0.4, 0.8]
+    tempering = ParallelTemperingAnnealer(random_annealer, temperatures,
+                                          processes=processes, seed=0)
+    state, energy = tempering.anneal(max_steps=200)
+
+    assert state == energy == tempering.best_energy
+    assert energy < 0.05
+    assert len(tempering.swap_rates) == len(temperatures) - 1
+    assert all(0 <= rate <= 1 for rate in tempering.swap_rates)
+
+
+def test_swaps_always_accepted_for_hot_low_energies():
+    tempering = ParallelTemperingAnnealer(None, [1, 2, 4])
+
+    # the replica at the coldest temperature has the highest energy
+    ladder = [0, 1, 2]
+    energies = [3, 2, 1]
+    n_accepted = [0, 0]
+
+    tempering._swap(ladder, energies, 0, None, n_accepted)
+
+    assert ladder == [1, 0, 2]
+    assert n_accepted == [1, 0]
+
+
+@pytest.mark.parametrize("max_steps, sweeps", [
+        (3, [3]),
+        (20, [10, 10]),
+        (25, [10, 10, 5])
+        ])
+def test_replicas_take_max_steps(random_annealer, monkeypatch, max_steps,
+                                 sweeps):
+    lengths = []
+    original = tempering._LocalReplica.start_sweep
+
+    def start_sweep(replica, temp, n_steps):
+        lengths.append(n_steps)
+        original(replica, temp, n_steps)
+
+    monkeypatch.setattr(tempering._LocalReplica, "start_sweep", start_sweep)
+
+    annealer = ParallelTemperingAnnealer(random_annealer, [0.1, 0.2],
+                                         processes=False, seed=0)
+    annealer.anneal(max_steps=max_steps)
+
+    # one sweep per replica per round
+    assert lengths == [n for n in sweeps for _ in range(2)]
@@ -0,0 +1,143 @@
+from anneal import schedules, threshold
+from examples.sudoku.sudoku import SudokuSolver
+from examples.tsp.tsp import TravelingSalesPerson
+from tests.conftest import LandscapeAnnealer, RandomAnnealer
+import numpy as np
+import pytest
+
+
+class ThresholdRandomAnnealer(threshold.ThresholdAcceptingAnnealer,
+                              RandomAnnealer):
+    pass
+
+
+class ThresholdLandscapeAnnealer(threshold.ThresholdAcceptingAnnealer,
+                                 LandscapeAnnealer):
+    pass
+
+
+class DelugeRandomAnnealer(threshold.GreatDelugeAnnealer, RandomAnnealer):
+    pass
+
+
+class RecordRandomAnnealer(threshold.RecordToRecordAnnealer,
+                           RandomAnnealer):
+    pass
+
+
+class DelugeSudoku(threshold.GreatDelugeAnnealer, SudokuSolver):
+    pass
+
+
+class ThresholdTSP(threshold.ThresholdAcceptingAnnealer,
+                   TravelingSalesPerson):
+    pass
+
+
+def test_threshold_accepting():
+    annealer = ThresholdRandomAnnealer()
+
+    assert annealer._accept_state(0.1, 0.2)
+    assert not annealer._accept_state(0.2, 0.2)
+    assert not annealer._accept_state(0, 0)
+
+    # with a threshold of zero, only improvements are accepted
+    annealer.reseed(0)
+    annealer.anneal(schedule=schedules.Linear(0, 0))
+
+    assert annealer.state == annealer.best_state < 0.1
+
+
+def test_threshold_accepting_rejection_free():
+    annealer = ThresholdLandscapeAnnealer()
+    annealer.reseed(0)
+    annealer.anneal(schedule=schedules.Linear(1.5, 1.5), rejection_free=True)
+
+    # moves uphill by 1 are allowed, but not by 2 (from 1 to 3) or by 4
+    assert annealer.best_state == 3
+    assert annealer.state in [1, 2, 3]
+
+
+def test_great_deluge_default_levels():
+    annealer = DelugeRandomAnnealer()
+    annealer.anneal(target_energy=0.5)
+
+    assert annealer.schedule.t0 == 1
+    assert annealer.schedule.t_end == 0.5
+    assert annealer.energy <= 0.5
+
+
+def test_great_deluge_stays_below_level():
+    annealer = DelugeRandomAnnealer()
+    annealer.reseed(0)
+
+    levels = schedules.Linear(0.8, 0.2)
+    energies = []
+
+    original = annealer._handle_best
+
+    def handle_best():
+        energies.append((annealer.step, annealer.energy))
+        return original()
+
+    annealer._handle_best = handle_best
+    annealer.anneal(schedule=levels)
+
+    assert energies
+    assert all(energy <= levels(step, 100) for step, energy in energies)
+
+
+def test_great_deluge_with_negative_energies():
+    puzzle = [[0] * 4 for _ in range(4)]
+    solver = DelugeSudoku(puzzle, seed=0)
+
+    # the default level would rise to 0
+    with pytest.raises(ValueError):
+        solver.anneal()
+
+    _, energy = solver.anneal(max_steps=5000, target_energy=solver.optimum)
+
+    assert solver.schedule.t0 > solver.schedule.t_end == solver.optimum
+    assert energy == solver.optimum
+
+
+def test_record_to_record():
+    annealer = RecordRandomAnnealer()
+    annealer.reseed(0)
+
+    # with no deviation, only moves matching the record are accepted
+    annealer.anneal(schedule=schedules.Linear(0, 0))
+    assert annealer.state == annealer.best_state
+
+    annealer.anneal(schedule=schedules.Linear(0.1, 0.1))
+    assert annealer.energy <= annealer.best_energy + 0.1
+
+
+@pytest.mark.parametrize("annealer_class", [DelugeRandomAnnealer,
+                                            RecordRandomAnnealer])
+def test_levels_reject_rejection_free(annealer_class):
+    annealer = annealer_class()
+
+    with pytest.raises(ValueError):
+        annealer.anneal(rejection_free=True)
+
+
+def test_level_is_required():
+    class NoLevelAnnealer(threshold._LevelAnnealer, RandomAnnealer):
+        pass
+
+    with pytest.raises(TypeError):
+        NoLevelAnnealer()
+
+
+def test_threshold_accepting_tsp():
+    cities = np.random.default_rng(0).random((30, 2))
+    solver = ThresholdTSP(cities, seed=0)
+
+    initial_energy = solver.energy
+    route, energy = solver.anneal(max_steps=20000,
+                                  schedule=schedules.Linear(0.2, 0))
+
+    assert energy < initial_energy / 2
+    assert sorted(route) == list(range(30))
+    assert solver.energy == pytest.approx(solver.energy_method(solver.state))
@@ -0,0 +1,104 @@
+from anneal import helpers, trajectory
+import numpy as np
+import os
+
+
+def test_recorder_buffers_records(tmpdir):
+    file = str(tmpdir.join("trajectory.pickle"))
+
+    with trajectory.PickleRecorder(file, buffer_size=3) as recorder:
+        recorder.record(0, 1.0, None, "a")
+        recorder.record(1, 2.0, 0.5, "b")
+        assert os.path.getsize(file) == 0
+
+        recorder.record(2, 3.0, 0.5, "c")
+        assert os.path.getsize(file) > 0
+
+        recorder.record(3, 4.0, 0.5, "d")
+
+    assert recorder.closed
+
+    records = helpers.unpickle_objects(file)
+
+    assert records == [trajectory.Record(0, 1.0, None, "a"),
+                       trajectory.Record(1, 2.0, 0.5, "b"),
+                       trajectory.Record(2, 3.0, 0.5, "c"),
+                       trajectory.Record(3, 4.0, 0.5, "d")]
+
+
+def test_recorder_append(tmpdir):
+    file = str(tmpdir.join("trajectory.pickle"))
+
+    with trajectory.PickleRecorder(file) as recorder:
+        recorder.record(0, 1.0, None, "a")
+
+    with trajectory.PickleRecorder(file, append=True) as recorder:
+        recorder.record(1, 2.0, 0.5, "b")
+
+    assert [r.state for r in helpers.unpickle_objects(file)] == ["a", "b"]
+
+
+def test_as_record():
+    record = trajectory.Record(0, 1.0, None, "a")
+
+    assert trajectory.as_record(record) is record
+    assert trajectory.as_record("a") == trajectory.Record(None, None, None,
+                                                          "a")
+
+
+def test_array_recorder(tmpdir):
+    path = str(tmpdir.join("trajectory"))
+
+    with trajectory.ArrayRecorder(path, buffer_size=3) as recorder:
+        for i in range(7):
+            recorder.record(i, i / 2, None if i == 0 else 0.5,
+                            np.full((2, 3), i))
+
+        # only whole buffers have been written so far
+        assert len(trajectory.load_states(path)) == 6
+
+    states = trajectory.load_states(path)
+    records = trajectory.load_records(path)
+
+    assert isinstance(states, np.memmap)
+    assert states.shape == (7, 2, 3)
+    assert (states[:, 0, 0] == np.arange(7)).all()
+    assert list(records["step"]) == list(range(7))
+    assert list(records["energy"]) == [i / 2 for i in range(7)]
+    assert np.isnan(records["temperature"][0])
+    assert (records["temperature"][1:] == 0.5).all()
+
+
+def test_array_recorder_resume(tmpdir, monkeypatch):
+    path = str(tmpdir.join("trajectory"))
+
+    with trajectory.ArrayRecorder(path, buffer_size=2) as recorder:
+        for i in range(5):
+            recorder.record(i, float(i), 0.5, np.full(3, i, dtype=np.int16))
+
+            if i == 2:
+                position = recorder.position()
+
+    # the states file is truncated without being memory-mapped
+    def load_states(*args, **kwargs):
+        raise AssertionError("states.npy was memory-mapped")
+
+    monkeypatch.setattr(trajectory, "load_states", load_states)
+
+    with trajectory.ArrayRecorder(path, resume_at=position) as recorder:
+        recorder.record(3, 30.0, 0.5, np.full(3, 30))
+
+    monkeypatch.undo()
+    states = trajectory.load_states(path)
+
+    assert states.dtype == np.int16
+    assert list(states[:, 0]) == [0, 1, 2, 30]
+    assert list(trajectory.load_records(path)["energy"]) == [0, 1, 2, 30]
+
+
+def test_array_recorder_header_fits_large_counts(tmpdir):
+    appender = trajectory._NpyAppender(str(tmpdir.join("x.npy")), float, (3,))
+    lengths = {len(appender._header(n)) for n in [0, 1, 10**6, 2**62]}
+    appender.close()
+
+    assert len(lengths) == 1
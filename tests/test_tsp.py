@@ -1,6 +1,6 @@
 from examples.tsp.tsp import TravelingSalesPerson
+from tests.conftest import crash_after
 import pytest
-import random
 import numpy as np
 
 
@@ -22,27 +22,72 @@ def five_cities_on_line():
     return solver
 
 
-def test_neighbor_reverse_across_end():
-    random.seed(0)
-    np.random.seed(0)
+def edges(route):
+    """Set of (undirected) edges of a closed route."""
+    return {frozenset(edge) for edge in zip(route, np.roll(route, -1))}
+
 
+def test_apply_reverse_across_end():
     n_points = 10
     cities = [(i, i) for i in range(n_points)]
 
     solver = TravelingSalesPerson(cities)
 
-    # this is specific to this particular seed
-    before = np.copy(solver.initial_state)
-    after = np.copy(solver.neighbor(before))
+    before = np.arange(n_points, dtype=np.int32)
+    after = solver.apply(np.copy(before), (7, 5))
+
+    # reversing [7, 8, 9, 0, 1] is done by reversing [2, ..., 6] instead
+    assert (after == [0, 1, 6, 5, 4, 3, 2, 7, 8, 9]).all()
+
+    positions = [7, 8, 9, 0, 1]
+    reversed_subroute = np.copy(before)
+    reversed_subroute[positions] = before[positions[::-1]]
+
+    assert edges(after) == edges(reversed_subroute)
+
+    assert (solver.undo(after, (7, 5)) == before).all()
+
+
+def test_delta_energy(five_cities):
+    state = five_cities.initial_state
+
+    for _ in range(20):
+        move = five_cities.propose(state)
+        neighbor = five_cities.apply(np.copy(state), move)
+
+        expected = (five_cities.energy_method(neighbor) -
+                    five_cities.energy_method(state))
+
+        assert np.isclose(five_cities.delta_energy(state, move), expected)
+
+
+def test_neighbor_is_a_subroute_reversal(five_cities):
+    state = five_cities.initial_state
+    neighbor = five_cities.neighbor(state)
+
+    assert sorted(neighbor) == sorted(state)
+    assert len(edges(neighbor) - edges(state)) <= 2
+
+
+def test_anneal_in_place(five_cities):
+    assert five_cities.in_place
+
+    five_cities.anneal(max_steps=100)
+
+    assert np.isclose(five_cities.energy,
+                      five_cities.energy_method(five_cities.state))
 
-    before_subroute = np.concatenate((before[4:], before[:3]))
-    after_subroute = np.concatenate((after[4:], after[:3]))
 
-    assert (before_subroute == after_subroute[::-1]).all()
+def test_too_few_cities_to_move():
+    solver = TravelingSalesPerson([(0, 0), (1, 0), (0, 1)])
+
+    _, energy = solver.anneal(max_steps=10)
+    assert np.isclose(energy, 2 + np.sqrt(2))
 
 
 def test_energy_method(five_cities_on_line):
-    assert five_cities_on_line.energy == 8
+    route = np.arange(5, dtype=np.int32)
+    assert five_cities_on_line.energy_method(route) == 8
 
 
 def test_invalid_cities():
@@ -51,11 +96,9 @@ def test_invalid_cities():
 
 
 def test_small_cities_compared_to_brute_force(five_cities):
-    random.seed(0)
-    np.random.seed(0)
-
     n_runs = 20
     _, energies = five_cities.run(n_runs=n_runs,
+                                  seed=0,
                                   max_steps=1000,
                                   energy_break_rounds=10,
                                   energy_break_tol=1e-5)
@@ -64,3 +107,143 @@ def test_small_cities_compared_to_brute_force(five_cities):
     n_good = sum(abs(e - bf_energy)/bf_energy < 1e-2 for e in energies)
 
     assert n_good/n_runs > 0.8
+
+
+def test_state_is_permutation(five_cities):
+    state = five_cities.initial_state
+
+    assert state.dtype == np.int32
+    assert sorted(state) == list(range(5))
+
+
+def test_energy_without_distance_matrix():
+    np.random.seed(0)
+    cities = np.random.rand(20, 2)
+
+    with_matrix = TravelingSalesPerson(cities)
+    without_matrix = TravelingSalesPerson(cities, max_matrix_cities=10)
+
+    assert with_matrix.distances is not None
+    assert without_matrix.distances is None
+
+    state = with_matrix.initial_state
+    assert np.isclose(with_matrix.energy_method(state),
+                      without_matrix.energy_method(state))
+
+
+def test_route(five_cities_on_line):
+    route = five_cities_on_line.route()
+    assert (route[:, 0] == five_cities_on_line.state).all()
+
+
+def test_candidates():
+    np.random.seed(0)
+    cities = np.random.rand(50, 2)
+
+    solver = TravelingSalesPerson(cities, n_neighbors=5)
+    assert solver.candidates.shape == (50, 5)
+
+    solver = TravelingSalesPerson(cities, n_neighbors=None)
+    assert solver.candidates is None
+
+
+def test_propose_connects_near_neighbors():
+    np.random.seed(0)
+    cities = np.random.rand(50, 2)
+    solver = TravelingSalesPerson(cities, n_neighbors=3, seed=0)
+    state = solver.initial_state
+
+    n_proposals = 100
+    n_connected = 0
+
+    for _ in range(n_proposals):
+        start, length = solver.propose(state)
+
+        # the city before the subroute gets connected to its last city
+        city = state[start - 1]
+        last = state[(start + length - 1) % len(state)]
+        n_connected += last in solver.candidates[city]
+
+    # (the rest are uniformly random moves, for cities that are already next
+    # to the chosen candidate)
+    assert n_connected > 0.9*n_proposals
+
+
+def test_positions_follow_in_place_moves():
+    np.random.seed(0)
+    solver = TravelingSalesPerson(np.random.rand(30, 2))
+    solver.anneal(max_steps=200)
+
+    positions = solver.positions(solver.state)
+    assert (solver.state[positions] == np.arange(30)).all()
+
+
+def test_npy_trajectory(five_cities, tmpdir):
+    path = str(tmpdir.join("tsp.trajectory"))
+    five_cities.anneal(max_steps=200, pickle=True, pickle_file=path,
+                       record_format="npy", record_every=10, record_buffer=7)
+
+    states = five_cities.load_states()
+    records = five_cities.load_records()
+
+    assert isinstance(states, np.memmap)
+    assert states.shape == (21, 5)
+    assert states.dtype == np.int32
+    assert list(records["step"]) == list(range(0, 201, 10))
+    assert np.isnan(records["temperature"][0])
+
+    for state, energy in zip(states, records["energy"]):
+        assert sorted(state) == list(range(5))
+        assert np.isclose(energy, five_cities.energy_method(state))
+
+
+def test_resume_npy_trajectory(tmpdir):
+    cities = np.random.rand(20, 2)
+    path = str(tmpdir.join("tsp.trajectory"))
+    checkpoint_file = str(tmpdir.join("tsp.checkpoint"))
+
+    solver = TravelingSalesPerson(cities)
+
+    solver.reseed(0)
+    expected = solver.anneal(max_steps=500)
+
+    solver.reseed(0)
+    crash_after(solver, "propose", 321)
+
+    with pytest.raises(RuntimeError):
+        solver.anneal(max_steps=500, pickle=True, pickle_file=path,
+                      record_format="npy", record_every=1, record_buffer=64,
+                      checkpoint_every=100, checkpoint_file=checkpoint_file)
+
+    del solver.propose
+    best_state, best_energy = solver.anneal(resume_from=checkpoint_file)
+
+    assert (best_state == expected[0]).all()
+    assert best_energy == expected[1]
+    assert list(solver.load_records()["step"]) == list(range(501))
+
+
+def test_seed():
+    cities = np.random.rand(30, 2)
+    results = [TravelingSalesPerson(cities, seed=1).anneal(max_steps=500)
+               for _ in range(2)]
+
+    assert (results[0][0] == results[1][0]).all()
+    assert results[0][1] == results[1][1]
+
+
+def test_thread_runs_are_reproducible():
+    solver = TravelingSalesPerson(np.random.rand(30, 2))
+    runs = [solver.run(4, backend="thread", n_jobs=4, seed=0,
+                       max_steps=2000)[1] for _ in range(2)]
+
+    assert runs[0] == runs[1]
+
+
+def test_calibrate():
+    cities = 100*np.random.rand(50, 2)
+    solver = TravelingSalesPerson(cities, seed=0)
+    schedule = solver.calibrate(n_samples=200)
+
+    # the tour is hundreds long, so the default schedule would be too cold
+    assert schedule.t0 > 1